@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark overhead tracing per giliran chat: nonaktif vs sampled vs full.
+
+Giliran chat disimulasikan lewat CallbackManager LangChain dengan pola event
+yang sama seperti agent di main.py: agent utama (2 panggilan LLM + 1 tool),
+dan di dalam tool SQL sebuah sub-agent (4 panggilan LLM + 3 tool SQL).
+Trace dikirim ke collector HTTP lokal (stand-in Langfuse) lewat HttpJsonExporter.
+
+Contoh: python bench_tracing.py --turns 2000 --sample-rate 0.1
+"""
+
+import argparse
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from langchain_core.callbacks import CallbackManager
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+from tracing import HttpJsonExporter, Tracer
+
+
+class _Collector(BaseHTTPRequestHandler):
+    """Collector trace lokal: hanya menghitung record yang diterima."""
+
+    received = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with _Collector.lock:
+            _Collector.received += len(json.loads(body))
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def start_collector():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Collector)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/traces"
+
+
+_MESSAGES = [[HumanMessage(content="Top 5 film rating tertinggi")]]
+_LLM_RESULT = LLMResult(
+    generations=[[ChatGeneration(message=AIMessage(content="ok"))]],
+    llm_output={"token_usage": {"prompt_tokens": 900, "completion_tokens": 120, "total_tokens": 1020}},
+)
+
+
+def _llm_call(manager):
+    for run in manager.on_chat_model_start({"name": "ChatOpenAI"}, _MESSAGES):
+        run.on_llm_end(_LLM_RESULT)
+
+
+def simulate_turn(callbacks):
+    """Satu giliran agent: LLM -> tool SQL (sub-agent: LLM/tool x beberapa) -> LLM."""
+    manager = CallbackManager(handlers=callbacks, inheritable_handlers=callbacks)
+    agent_run = manager.on_chain_start({"name": "agent"}, {"messages": []})
+    agent = agent_run.get_child()
+
+    _llm_call(agent)
+    tool_run = agent.on_tool_start({"name": "get_factual_movie_data"}, "top 5 film")
+    sub_run = tool_run.get_child().on_chain_start({"name": "sql_agent"}, {"messages": []})
+    sub_agent = sub_run.get_child()
+    for tool_name in ("sql_db_list_tables", "sql_db_schema", "sql_db_query"):
+        _llm_call(sub_agent)
+        sub_agent.on_tool_start({"name": tool_name}, "...").on_tool_end("rows")
+    _llm_call(sub_agent)
+    sub_run.on_chain_end({"messages": []})
+    tool_run.on_tool_end("jawaban")
+    _llm_call(agent)
+    agent_run.on_chain_end({"messages": []})
+
+
+def run_mode(label, tracer, turns):
+    """Jalankan `turns` giliran; return statistik durasi jalur chat (mikrodetik)."""
+    durations = []
+    for i in range(turns):
+        start = time.perf_counter()
+        turn = tracer.start_turn(name=f"Query {i}", session_id="bench", input="Top 5 film")
+        simulate_turn([turn.handler] if turn else [])
+        if turn:
+            turn.finish(output="jawaban")
+        durations.append((time.perf_counter() - start) * 1e6)
+    tracer.flush(timeout=30)
+    durations.sort()
+    return {
+        "mode": label,
+        "mean_us": statistics.fmean(durations),
+        "p50_us": durations[len(durations) // 2],
+        "p95_us": durations[int(len(durations) * 0.95) - 1],
+        "exported": tracer.exported,
+        "dropped": tracer.dropped,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=1000)
+    parser.add_argument("--sample-rate", type=float, default=0.1)
+    args = parser.parse_args()
+
+    server, url = start_collector()
+    exporter = HttpJsonExporter(url)
+
+    # Warm-up agar import/JIT cache tidak masuk pengukuran
+    run_mode("warm-up", Tracer(None), min(args.turns, 100))
+
+    results = [
+        run_mode("off", Tracer(None), args.turns),
+        run_mode(f"sampled ({args.sample_rate:g})", Tracer(exporter, sample_rate=args.sample_rate), args.turns),
+        run_mode("full", Tracer(exporter, sample_rate=1.0), args.turns),
+    ]
+    server.shutdown()
+
+    baseline = results[0]["mean_us"]
+    print(f"{'='*78}")
+    print(f"{'Mode':<16}{'mean (us)':>12}{'p50 (us)':>12}{'p95 (us)':>12}{'overhead':>12}{'exported':>10}{'dropped':>9}")
+    print(f"{'='*78}")
+    for r in results:
+        print(
+            f"{r['mode']:<16}{r['mean_us']:>12.1f}{r['p50_us']:>12.1f}{r['p95_us']:>12.1f}"
+            f"{r['mean_us'] - baseline:>+12.1f}{r['exported']:>10}{r['dropped']:>9}"
+        )
+    print(f"{'='*78}")
+    print(f"Record diterima collector: {_Collector.received}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+Penyimpanan riwayat chat yang persisten dan memorinya terbatas.
+
+Riwayat setiap sesi disimpan di SQLite (conversations.db). Di memori hanya
+disimpan "hot window" berisi beberapa pesan terakhir per sesi, dan jumlah sesi
+di memori dibatasi dengan kebijakan LRU: sesi yang paling lama tidak diakses
+dikeluarkan dari memori dan dimuat ulang (rehydrate) dari SQLite berdasarkan
+session_id saat dibutuhkan lagi.
+
+Penulisan ke SQLite bersifat write-behind: pesan baru masuk antrean dan
+di-flush secara batch oleh thread latar belakang, sehingga giliran chat tidak
+menunggu disk. Batch yang gagal ditulis dikembalikan ke depan antrean dan dicoba
+ulang dengan backoff, sehingga urutannya tetap terjaga. Rehydrate sesi membaca
+SQLite ditambah pesan sesi itu yang masih di antrean (tanpa flush di thread
+pemanggil). Antrean dibatasi MAX_PENDING pesan: jika SQLite terus gagal, pesan
+terlama yang belum tersimpan dibuang agar memori proses tetap terbatas.
+
+Catatan keamanan: session_id adalah satu-satunya kunci akses riwayat. Siapa pun
+yang mengetahui session_id dapat membaca riwayat sesi tersebut, jadi gunakan id
+acak yang tidak bisa ditebak (lihat new_session_id / is_valid_session_id).
+"""
+
+import atexit
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+DEFAULT_DB_PATH = "conversations.db"
+HOT_WINDOW = 20  # pesan terakhir per sesi yang disimpan di memori
+MAX_SESSIONS = 200  # jumlah sesi maksimum di memori (LRU)
+FLUSH_INTERVAL = 1.0  # detik antar flush write-behind
+FLUSH_BATCH_SIZE = 100  # flush lebih awal jika antrean mencapai ukuran ini
+MAX_FLUSH_BACKOFF = 30.0  # detik; batas atas jeda retry saat flush terus gagal
+MAX_PENDING = 5000  # batas pesan di antrean write-behind; kelebihannya (terlama) dibuang
+
+
+def new_session_id():
+    """Session id acak (uuid4, 122 bit) yang tidak bisa ditebak."""
+    return str(uuid.uuid4())
+
+
+def is_valid_session_id(value):
+    """True jika `value` berbentuk uuid4 kanonik (menolak id pendek/mudah ditebak)."""
+    try:
+        parsed = uuid.UUID(str(value))
+    except ValueError:
+        return False
+    return parsed.version == 4 and str(parsed) == value
+
+
+class _SessionEntry:
+    """Status in-memory satu sesi: hot window + total jumlah pesan."""
+
+    __slots__ = ("messages", "total")
+
+    def __init__(self, messages, total, hot_window):
+        self.messages = deque(messages, maxlen=hot_window)
+        self.total = total
+
+
+class ConversationStore:
+    """Store riwayat chat berbasis SQLite dengan hot window, LRU, dan write-behind."""
+
+    def __init__(
+        self,
+        db_path=DEFAULT_DB_PATH,
+        hot_window=HOT_WINDOW,
+        max_sessions=MAX_SESSIONS,
+        flush_interval=FLUSH_INTERVAL,
+        flush_batch_size=FLUSH_BATCH_SIZE,
+        max_pending=MAX_PENDING,
+    ):
+        self.db_path = db_path
+        self.hot_window = hot_window
+        self.max_sessions = max_sessions
+        self.flush_interval = flush_interval
+        self.flush_batch_size = flush_batch_size
+        self.max_pending = max_pending
+        self.dropped = 0  # jumlah pesan yang dibuang karena antrean penuh
+
+        self._sessions = OrderedDict()
+        self._pending = []
+        self._lock = threading.RLock()
+        self._db_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._closed = False
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        ''')
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, id)"
+        )
+        self._conn.commit()
+
+        self._flusher = threading.Thread(target=self._flush_loop, name="conversation-flush", daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    # Akses sesi (LRU)
+    def _load(self, session_id, limit):
+        """
+        Total pesan sesi dan `limit` pesan terakhirnya (semua jika None): SQLite + antrean write-behind.
+        Harus dipanggil dengan _db_lock dipegang, sehingga tidak ada batch yang sedang di tengah flush.
+        """
+        total = self._conn.execute(
+            "SELECT COUNT(*) FROM messages WHERE session_id = ?", (session_id,)
+        ).fetchone()[0]
+        if limit is None:
+            rows = self._conn.execute(
+                "SELECT role, content FROM messages WHERE session_id = ? ORDER BY id",
+                (session_id,),
+            ).fetchall()
+        else:
+            rows = self._conn.execute(
+                "SELECT role, content FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+                (session_id, limit),
+            ).fetchall()
+            rows.reverse()
+        with self._lock:
+            pending = [(role, content) for sid, role, content, _ in self._pending if sid == session_id]
+        rows += pending
+        if limit is not None:
+            rows = rows[-limit:] if limit else []
+        return total + len(pending), [{"role": role, "content": content} for role, content in rows]
+
+    def _entry(self, session_id):
+        """Ambil entry sesi dari memori, atau rehydrate dari SQLite + antrean (lalu evict jika penuh)."""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                self._sessions.move_to_end(session_id)
+                return entry
+
+        with self._db_lock:
+            total, messages = self._load(session_id, self.hot_window)
+            with self._lock:
+                entry = self._sessions.get(session_id)
+                if entry is None:
+                    entry = _SessionEntry(messages, total, self.hot_window)
+                    self._sessions[session_id] = entry
+                    while len(self._sessions) > self.max_sessions:
+                        self._sessions.popitem(last=False)
+                self._sessions.move_to_end(session_id)
+                return entry
+
+    def get_messages(self, session_id):
+        """Pesan di hot window (terlama -> terbaru)."""
+        entry = self._entry(session_id)
+        with self._lock:
+            return list(entry.messages)
+
+    def count(self, session_id):
+        """Total jumlah pesan sesi (termasuk yang sudah tidak di memori)."""
+        entry = self._entry(session_id)
+        with self._lock:
+            return entry.total
+
+    def get_history(self, session_id, limit=None):
+        """
+        Ambil `limit` pesan terakhir sesi (semua jika None).
+        Jika masih muat di hot window, dilayani dari memori; selain itu dibaca dari SQLite.
+        """
+        entry = self._entry(session_id)
+        with self._lock:
+            if limit is not None and limit <= len(entry.messages):
+                return list(entry.messages)[-limit:] if limit else []
+            if entry.total == len(entry.messages):
+                return list(entry.messages)
+
+        with self._db_lock:
+            return self._load(session_id, limit)[1]
+
+    def append(self, session_id, role, content):
+        """Tambahkan pesan: langsung ke hot window, ditulis ke SQLite secara write-behind."""
+        entry = self._entry(session_id)
+        with self._lock:
+            entry.messages.append({"role": role, "content": content})
+            entry.total += 1
+            self._pending.append((session_id, role, content, time.time()))
+            self._trim_pending()
+            if len(self._pending) >= self.flush_batch_size:
+                self._wakeup.set()
+
+    def _trim_pending(self):
+        """Buang pesan terlama jika antrean melebihi max_pending (dipanggil dengan _lock dipegang)."""
+        overflow = len(self._pending) - self.max_pending
+        if overflow > 0:
+            del self._pending[:overflow]
+            self.dropped += overflow
+            print(f"Peringatan: Antrean riwayat chat penuh ({self.max_pending} pesan), "
+                  f"{overflow} pesan terlama tidak disimpan ke '{self.db_path}'.")
+
+    def clear(self, session_id):
+        """Hapus seluruh riwayat sesi (memori, antrean, dan SQLite)."""
+        # Di bawah _db_lock agar batch gagal yang dikembalikan flush() tidak menulis ulang sesi ini
+        with self._db_lock:
+            with self._lock:
+                self._sessions.pop(session_id, None)
+                self._pending = [item for item in self._pending if item[0] != session_id]
+            self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+
+    # Write-behind
+    def flush(self):
+        """
+        Tulis semua pesan di antrean ke SQLite dalam satu transaksi.
+        Jika gagal, transaksi di-rollback dan batch dikembalikan ke depan antrean
+        (sebelum pesan yang masuk selama flush), lalu error diteruskan ke pemanggil.
+        """
+        # Swap antrean di bawah _db_lock agar urutan batch antar-thread tetap terjaga
+        with self._db_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return
+            try:
+                self._conn.executemany(
+                    "INSERT INTO messages (session_id, role, content, created_at) VALUES (?, ?, ?, ?)",
+                    batch,
+                )
+                self._conn.commit()
+            except Exception:
+                try:
+                    self._conn.rollback()
+                except sqlite3.Error:
+                    pass
+                with self._lock:
+                    self._pending = batch + self._pending
+                    self._trim_pending()
+                raise
+
+    def _flush_loop(self):
+        failures = 0
+        while not self._closed:
+            if failures:
+                # Backoff eksponensial selama flush gagal; antrean penuh tidak mempercepat retry
+                self._stop.wait(min(self.flush_interval * (2 ** failures), MAX_FLUSH_BACKOFF))
+            else:
+                self._wakeup.wait(self.flush_interval)
+            if self._closed:
+                break
+            self._wakeup.clear()
+            try:
+                self.flush()
+                failures = 0
+            except Exception as e:
+                failures += 1
+                print(f"Peringatan: Gagal menyimpan riwayat chat ke '{self.db_path}' "
+                      f"(percobaan ke-{failures}, akan dicoba ulang). Error: {e}")
+
+    def close(self):
+        """Flush antrean terakhir dan tutup koneksi (dipanggil otomatis saat proses berhenti)."""
+        if self._closed:
+            return
+        self._closed = True
+        self._stop.set()
+        self._wakeup.set()
+        self._flusher.join(timeout=self.flush_interval + 1)
+        self.flush()
+        with self._db_lock:
+            self._conn.close()
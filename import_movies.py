@@ -1,13 +1,15 @@
 #!/usr/bin/env python3
 """
 Script untuk mengisi database movies.db dari file CSV IMDb Top 1000
+(data dibersihkan lewat preprocessing.py)
 """
 
 import sqlite3
-import csv
 import sys
 from pathlib import Path
 
+from preprocessing import SQL_COLUMNS, load_movies, to_sql_rows
+
 
 def create_database(db_path):
     """Membuat database dan tabel movies jika belum ada"""
@@ -41,30 +43,8 @@ def create_database(db_path):
     return conn
 
 
-def clean_value(value, data_type='string'):
-    """Membersihkan nilai dari CSV"""
-    if value == '' or value is None:
-        return None
-    
-    value = value.strip()
-    
-    if data_type == 'integer':
-        try:
-            return int(float(value))
-        except (ValueError, TypeError):
-            return None
-    elif data_type == 'float':
-        try:
-            return float(value)
-        except (ValueError, TypeError):
-            return None
-    else:
-        return value
-
-
-def import_csv_to_db(csv_path, db_path):
-    """Import data dari CSV ke database"""
-    # Membuat atau membuka database
+def import_dataframe_to_db(df, db_path):
+    """Import DataFrame hasil preprocessing.clean_movies ke tabel movies (batch executemany)"""
     conn = create_database(db_path)
     cursor = conn.cursor()
     
@@ -72,57 +52,31 @@ def import_csv_to_db(csv_path, db_path):
     cursor.execute('DELETE FROM movies')
     print("Data lama telah dihapus.")
     
-    # Membaca dan memasukkan data dari CSV
-    imported_count = 0
-    error_count = 0
-    
-    with open(csv_path, 'r', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        
-        for row in reader:
-            try:
-                cursor.execute('''
-                    INSERT INTO movies (
-                        poster_link, title, released_year, certificate,
-                        runtime, genre, imdb_rating, overview, meta_score,
-                        director, star1, star2, star3, star4,
-                        no_of_votes, gross
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    clean_value(row['Poster_Link']),
-                    clean_value(row['Series_Title']),
-                    clean_value(row['Released_Year'], 'integer'),
-                    clean_value(row['Certificate']),
-                    clean_value(row['Runtime'], 'integer'),
-                    clean_value(row['Genre']),
-                    clean_value(row['IMDB_Rating'], 'float'),
-                    clean_value(row['Overview']),
-                    clean_value(row['Meta_score'], 'float'),
-                    clean_value(row['Director']),
-                    clean_value(row['Star1']),
-                    clean_value(row['Star2']),
-                    clean_value(row['Star3']),
-                    clean_value(row['Star4']),
-                    clean_value(row['No_of_Votes'], 'integer'),
-                    clean_value(row['Gross'], 'float')
-                ))
-                imported_count += 1
-                
-                # Progress indicator
-                if imported_count % 100 == 0:
-                    print(f"Imported {imported_count} movies...")
-                    
-            except Exception as e:
-                error_count += 1
-                print(f"Error importing movie '{row.get('Series_Title', 'Unknown')}': {e}")
+    # Nilai sudah bertipe dan bersih dari preprocessing, jadi cukup satu INSERT batch
+    columns = ', '.join(SQL_COLUMNS.values())
+    placeholders = ', '.join('?' for _ in SQL_COLUMNS)
+    rows = to_sql_rows(df)
+    cursor.executemany(f'INSERT INTO movies ({columns}) VALUES ({placeholders})', rows)
     
     conn.commit()
     conn.close()
+
+    # Naikkan versi database agar cache hasil query SQL di aplikasi otomatis invalid
+    # (import lokal: sql_cache memuat langchain_community)
+    from sql_cache import bump_db_version
+    bump_db_version(db_path)
+    return len(rows)
+
+
+def import_csv_to_db(csv_path, db_path):
+    """Import data dari CSV (atau artifact Parquet) ke database"""
+    # Cleaning dilakukan sekali secara vektor di preprocessing.py, bukan per baris di sini
+    df = load_movies(csv_path)
+    imported_count = import_dataframe_to_db(df, db_path)
     
     print(f"\n{'='*50}")
     print(f"Import selesai!")
     print(f"Total film berhasil diimport: {imported_count}")
-    print(f"Total error: {error_count}")
     print(f"{'='*50}")
 
 
@@ -0,0 +1,609 @@
+#!/usr/bin/env python3
+"""
+Load test headless: N sesi chat bersamaan terhadap agent dan tools yang sama dengan main.py.
+
+Setiap sesi menjalankan skrip multi-giliran (rekomendasi, faktual, follow-up) lewat
+jalur yang sama dengan UI: ConversationStore -> movie_agent.run_agent_turn (agent
+utama, tool RAG, sub-agent SQL) -> simpan jawaban. Dependensi remote diganti:
+- Chat model palsu (ScriptedChatModel) dengan latency dan kapasitas yang bisa diatur
+  (mensimulasikan rate limit provider), memilih tool / query SQL sesuai skrip.
+- Embedding palsu (deterministik) dengan latency yang bisa diatur.
+- Qdrant in-memory berisi dataset yang sama (artifact preprocessing.py).
+- movies.db asli lewat pool read-only sql_guard.
+
+Laporan: throughput, latency giliran p50/p95/p99 (total dan per jenis giliran),
+durasi per tahap (dari trace LLM/tool), dan antrean per sumber daya (waktu tunggu
+dan kedalaman antrean), serta log error/peringatan yang dicetak agent selama giliran
+(ditangkap per giliran, juga dari thread tool). Exit code 1 jika SLO latency atau
+error rate terlampaui.
+
+Contoh: python loadtest.py --users 20 --sessions 60 --llm-latency 0.8 --llm-concurrency 8
+"""
+
+import argparse
+import ast
+import contextlib
+import contextvars
+import math
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict, namedtuple
+from typing import Any
+
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import ConfigDict
+
+import movie_agent
+from conversation_store import ConversationStore
+from preprocessing import ARTIFACT_PATH, build_documents, load_movies
+from resilience import HEDGE_WORKERS, pending_hedged_calls
+from sql_guard import POOL_SIZE, get_readonly_engine
+from startup_profile import set_resource
+from tracing import Tracer
+
+EMBEDDING_SIZE = 256
+
+# Default skenario (detik); latency = median, jitter = sigma distribusi log-normal
+DEFAULT_LLM_LATENCY = 0.5
+DEFAULT_EMBEDDING_LATENCY = 0.05
+DEFAULT_SEARCH_LATENCY = 0.02
+DEFAULT_JITTER = 0.3
+DEFAULT_THINK_TIME = 1.0
+DEFAULT_SLO_P95 = 10.0
+DEFAULT_MAX_ERROR_RATE = 0.01
+ERROR_REPORT_LIMIT = 10  # pesan error terbanyak yang ditampilkan di laporan
+
+# Skrip sesi. Tiap giliran mencatat tool dan argumen yang "seharusnya" dipilih LLM
+# (follow-up sudah digabung dengan konteks sebelumnya), plus query SQL untuk sub-agent.
+Turn = namedtuple("Turn", ["kind", "text", "tool", "tool_question", "sql"], defaults=[None])
+
+SESSION_SCRIPTS = {
+    "rekomendasi": [
+        Turn("rekomendasi", "Rekomendasi film yang mirip Interstellar",
+             "get_movie_recommendations", "film sci-fi luar angkasa mirip Interstellar"),
+        Turn("follow-up", "Yang rilis tahun 2000-an aja dong",
+             "get_movie_recommendations", "film sci-fi luar angkasa mirip Interstellar tahun 2000-an"),
+        Turn("follow-up", "Kalau yang ratingnya di atas 8?",
+             "get_movie_recommendations", "film sci-fi luar angkasa tahun 2000-an rating di atas 8"),
+    ],
+    "faktual": [
+        Turn("faktual", "Top 5 film rating tertinggi",
+             "get_factual_movie_data", "top 5 film rating tertinggi",
+             "SELECT title, imdb_rating, poster_link FROM movies ORDER BY imdb_rating DESC LIMIT 5;"),
+        Turn("follow-up", "Kalau rata-rata pendapatan film Christopher Nolan berapa?",
+             "get_factual_movie_data", "rata-rata pendapatan film Christopher Nolan",
+             "SELECT AVG(gross) FROM movies WHERE director = 'Christopher Nolan';"),
+        Turn("follow-up", "Film Nolan yang paling lama durasinya apa?",
+             "get_factual_movie_data", "film Christopher Nolan dengan durasi terlama",
+             "SELECT title, runtime, poster_link FROM movies WHERE director = 'Christopher Nolan' "
+             "ORDER BY runtime DESC LIMIT 1;"),
+    ],
+    "campuran": [
+        Turn("rekomendasi", "Apa film horor dengan rating terbaik?",
+             "get_movie_recommendations", "film horor dengan rating terbaik"),
+        Turn("faktual", "Berapa jumlah film horor di atas 120 menit?",
+             "get_factual_movie_data", "jumlah film horor dengan durasi di atas 120 menit",
+             "SELECT COUNT(*) FROM movies WHERE genre LIKE '%Horror%' AND runtime > 120;"),
+        Turn("follow-up", "Ada yang mirip tapi drama kriminal tahun 90-an?",
+             "get_movie_recommendations", "film drama kriminal tahun 90-an dengan suasana gelap"),
+    ],
+}
+
+_SCRIPTED_TURNS = {turn.text: turn for script in SESSION_SCRIPTS.values() for turn in script}
+_SCRIPTED_SQL = {turn.tool_question: turn.sql for turn in _SCRIPTED_TURNS.values() if turn.sql}
+_FACTUAL_WORDS = ("top", "berapa", "rata-rata", "jumlah", "total", "tertinggi", "terlaris")
+DEFAULT_SQL = "SELECT title, imdb_rating, poster_link FROM movies ORDER BY imdb_rating DESC LIMIT 5;"
+
+
+def sample_latency(median, jitter):
+    """Latency acak log-normal di sekitar `median` (ekor kanan seperti API remote)."""
+    if median <= 0:
+        return 0.0
+    return median * random.lognormvariate(0.0, jitter)
+
+
+def percentile(values, q):
+    """Percentile nearest-rank (q dalam 0-100); 0 jika kosong."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+
+class LimitedResource:
+    """Dependensi dengan kapasitas terbatas (0 = tak terbatas): catat waktu antre dan layanan."""
+
+    def __init__(self, name, capacity=0):
+        self.name = name
+        self.capacity = capacity
+        self.waiting = 0
+        self.waits = []
+        self.services = []
+        self._semaphore = threading.BoundedSemaphore(capacity) if capacity else None
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def use(self):
+        queued = time.perf_counter()
+        with self._lock:
+            self.waiting += 1
+        if self._semaphore:
+            self._semaphore.acquire()
+        started = time.perf_counter()
+        with self._lock:
+            self.waiting -= 1
+        try:
+            yield
+        finally:
+            if self._semaphore:
+                self._semaphore.release()
+            with self._lock:
+                self.waits.append(started - queued)
+                self.services.append(time.perf_counter() - started)
+
+    def call(self, median, jitter):
+        """Simulasikan satu panggilan remote: antre kapasitas, lalu tunggu latency."""
+        with self.use():
+            time.sleep(sample_latency(median, jitter))
+
+
+# BAGIAN 1: DEPENDENSI PALSU
+def _tool_call(name, args):
+    return AIMessage(content="", tool_calls=[{
+        "name": name, "args": args, "id": f"call_{uuid.uuid4().hex[:12]}", "type": "tool_call",
+    }])
+
+
+def _final_answer(tool_output):
+    """Jawaban akhir agent utama: tabel markdown poster dari output tool + follow-up."""
+    body = tool_output.split("||SQL_QUERY||")[0]
+    titles = re.findall(r"Judul: ([^\n|]+)", body)
+    posters = re.findall(r"\|\|POSTER\|\|(\S+)", body)
+    rows = [f"| ![Poster]({poster}) | {title.strip()} |" for title, poster in zip(titles, posters)]
+    if not rows:
+        return f"Nih hasilnya bro! 🍿\n{body.strip()}\n\nMau gue cariin yang lain?"
+    table = "\n".join(["| Poster | Film |", "|---|---|", *rows])
+    return f"Wah, mantap banget pilihannya! 🎬\n{table}\n\nBtw, lu udah nonton yang mana aja nih? 🍿"
+
+
+def _sql_answer(rows_text):
+    """Jawaban akhir sub-agent SQL dari hasil sql_db_query (repr list tuple)."""
+    try:
+        rows = ast.literal_eval(rows_text) if rows_text else []
+    except (ValueError, SyntaxError):
+        return f"Hasil query: {rows_text}"
+    lines = []
+    for row in rows:
+        values = [str(value) for value in row]
+        poster = next((v for v in values if v.startswith(("http", "app/static"))), None)
+        others = [v for v in values if v != poster]
+        if poster:
+            lines.append(f"Judul: {others[0]} ({', '.join(others[1:])}) ||POSTER||{poster}")
+        else:
+            lines.append(f"Hasil: {', '.join(values)}")
+    return "\n".join(lines) or "Tidak ada data yang cocok."
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Chat model palsu untuk agent utama dan sub-agent SQL. Keputusan tool diambil dari
+    SESSION_SCRIPTS (fallback: kata kunci); setiap panggilan melewati `resource`
+    (kapasitas provider) dan tidur selama latency acak.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    latency: float = DEFAULT_LLM_LATENCY
+    jitter: float = DEFAULT_JITTER
+    resource: Any = None
+
+    @property
+    def _llm_type(self):
+        return "scripted-fake"
+
+    def bind_tools(self, tools, *, tool_choice=None, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    def _generate(self, messages, stop=None, run_manager=None, tools=None, **kwargs):
+        tool_names = {t["function"]["name"] for t in tools or []}
+        if "sql_db_query" in tool_names:
+            message = self._sql_agent_step(messages)
+        else:
+            message = self._main_agent_step(messages)
+        self.resource.call(self.latency, self.jitter)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    @staticmethod
+    def _main_agent_step(messages):
+        last = messages[-1]
+        if isinstance(last, ToolMessage):
+            return AIMessage(content=_final_answer(last.content))
+        question = last.content
+        turn = _SCRIPTED_TURNS.get(question)
+        if turn:
+            return _tool_call(turn.tool, {"question": turn.tool_question})
+        factual = any(word in question.lower() for word in _FACTUAL_WORDS)
+        tool = "get_factual_movie_data" if factual else "get_movie_recommendations"
+        return _tool_call(tool, {"question": question})
+
+    @staticmethod
+    def _sql_agent_step(messages):
+        start = max(i for i, m in enumerate(messages) if isinstance(m, HumanMessage))
+        question = messages[start].content
+        results = [m for m in messages[start + 1:] if isinstance(m, ToolMessage)]
+        plan = [
+            ("sql_db_list_tables", {"tool_input": ""}),
+            ("sql_db_schema", {"table_names": "movies"}),
+            ("sql_db_query", {"query": _SCRIPTED_SQL.get(question, DEFAULT_SQL)}),
+        ]
+        if len(results) < len(plan):
+            return _tool_call(*plan[len(results)])
+        return AIMessage(content=_sql_answer(results[-1].content))
+
+
+class SlowFakeEmbeddings(Embeddings):
+    """Embedding deterministik palsu; embed_query melewati `resource` dengan latency acak."""
+
+    def __init__(self, resource, latency=DEFAULT_EMBEDDING_LATENCY, jitter=DEFAULT_JITTER, size=EMBEDDING_SIZE):
+        self.resource = resource
+        self.latency = latency
+        self.jitter = jitter
+        self._inner = DeterministicFakeEmbedding(size=size)
+
+    def embed_documents(self, texts):
+        # Dipakai saat mengisi Qdrant in-memory: tanpa latency agar setup cepat
+        return self._inner.embed_documents(texts)
+
+    def embed_query(self, text):
+        self.resource.call(self.latency, self.jitter)
+        return self._inner.embed_query(text)
+
+
+def build_vector_store(embeddings, resource, latency, jitter, data_path=ARTIFACT_PATH):
+    """Qdrant in-memory berisi dataset yang sama dengan setup.py; search lewat `resource`."""
+    from langchain_qdrant import QdrantVectorStore
+    from qdrant_client import QdrantClient, models
+
+    client = QdrantClient(location=":memory:")
+    client.create_collection(
+        collection_name=movie_agent.QDRANT_COLLECTION_NAME,
+        vectors_config=models.VectorParams(size=EMBEDDING_SIZE, distance=models.Distance.COSINE),
+    )
+    store = QdrantVectorStore(
+        client=client,
+        collection_name=movie_agent.QDRANT_COLLECTION_NAME,
+        embedding=embeddings,
+    )
+    store.add_documents(build_documents(load_movies(data_path)))
+
+    search = store.similarity_search_by_vector
+
+    def similarity_search_by_vector(*args, **kwargs):
+        with resource.use():
+            time.sleep(sample_latency(latency, jitter))
+            return search(*args, **kwargs)
+
+    store.similarity_search_by_vector = similarity_search_by_vector
+    return store
+
+
+class MemoryExporter:
+    """Exporter trace yang hanya menyimpan record di memori (untuk statistik per tahap)."""
+
+    def __init__(self):
+        self.records = []
+
+    def export(self, batch):
+        self.records.extend(batch)
+
+
+class QueueSampler:
+    """Thread yang mencatat kedalaman antrean tiap sumber daya secara berkala."""
+
+    def __init__(self, probes, interval=0.05):
+        self.probes = probes
+        self.interval = interval
+        self.samples = defaultdict(list)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="queue-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            for name, probe in self.probes.items():
+                self.samples[name].append(probe())
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+# Buffer output giliran yang sedang berjalan; ikut tersalin ke thread tool LangGraph dan
+# thread hedged_call (keduanya menjalankan pekerjaan dengan contextvars.copy_context())
+_turn_output = contextvars.ContextVar("turn_output", default=None)
+
+# Baris log agent yang dianggap error/peringatan (lihat print di movie_agent/resilience/tracing)
+_ERROR_LINE = re.compile(r"error|gagal|peringatan|tidak tersedia|ditolak", re.IGNORECASE)
+
+
+class TurnOutputCapture:
+    """Pengganti sys.stdout: tulisan di dalam capture_turn() masuk ke buffer giliran itu."""
+
+    def __init__(self, passthrough):
+        self.passthrough = passthrough
+
+    def write(self, text):
+        buffer = _turn_output.get()
+        if buffer is not None:
+            buffer.append(text)
+        if self.passthrough is not None:
+            self.passthrough.write(text)
+        return len(text)
+
+    def flush(self):
+        if self.passthrough is not None:
+            self.passthrough.flush()
+
+
+@contextlib.contextmanager
+def capture_turn():
+    """Kumpulkan semua print selama satu giliran; yield list potongan teks."""
+    buffer = []
+    token = _turn_output.set(buffer)
+    try:
+        yield buffer
+    finally:
+        _turn_output.reset(token)
+
+
+def error_lines(output):
+    """Baris error/peringatan dari output satu giliran."""
+    return [line.strip() for line in "".join(output).splitlines() if _ERROR_LINE.search(line)]
+
+
+# BAGIAN 2: SESI SINTETIS
+TurnResult = namedtuple("TurnResult", ["script", "kind", "latency", "ok", "degraded", "errors"])
+
+
+def run_session(script_name, store, tracer, think_time, rng):
+    """Satu sesi chat: alur yang sama dengan main.py untuk setiap giliran di skrip."""
+    session_id = f"loadtest-{uuid.uuid4()}"
+    if store.count(session_id) == 0:
+        store.append(session_id, "assistant", movie_agent.GREETING)
+
+    results = []
+    for turn in SESSION_SCRIPTS[script_name]:
+        time.sleep(think_time * rng.uniform(0.5, 1.5))
+        start = time.perf_counter()
+
+        store.append(session_id, "user", turn.text)
+        messages = movie_agent.to_langchain_messages(store.get_messages(session_id))
+        run_name = f"Query: {turn.text[:30]}..."
+        turn_trace = tracer.start_turn(name=run_name, session_id=session_id, input=turn.text)
+        config = {"callbacks": [turn_trace.handler] if turn_trace else [], "run_name": run_name}
+        with capture_turn() as output:
+            outcome = movie_agent.run_agent_turn(messages, turn.text, config=config, session_id=session_id)
+        if turn_trace:
+            turn_trace.finish(output=outcome["answer"], error=None if outcome["ok"] else "agent gagal")
+        store.append(session_id, "assistant", outcome["answer"])
+
+        results.append(TurnResult(
+            script=script_name,
+            kind=turn.kind,
+            latency=time.perf_counter() - start,
+            ok=outcome["ok"],
+            degraded=outcome["tool_output"].startswith("Pencarian semantik sedang tidak tersedia"),
+            errors=error_lines(output),
+        ))
+    return results
+
+
+def run_load(args, store, tracer):
+    """Jalankan `args.sessions` sesi dengan `args.users` sesi bersamaan; return (hasil, durasi)."""
+    rng = random.Random(args.seed)
+    plans = [rng.choice(sorted(SESSION_SCRIPTS)) for _ in range(args.sessions)]
+    plans_lock = threading.Lock()
+    results = []
+    results_lock = threading.Lock()
+
+    def user(index):
+        # Ramp-up: user mulai bertahap agar tidak semua giliran pertama datang bersamaan
+        time.sleep(args.ramp_up * index / max(args.users, 1))
+        user_rng = random.Random(args.seed + index)
+        while True:
+            with plans_lock:
+                if not plans:
+                    return
+                script_name = plans.pop()
+            session_results = run_session(script_name, store, tracer, args.think_time, user_rng)
+            with results_lock:
+                results.extend(session_results)
+
+    threads = [threading.Thread(target=user, args=(i,), name=f"user-{i}") for i in range(args.users)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - start
+
+
+# BAGIAN 3: LAPORAN
+def _ms(seconds):
+    return seconds * 1000
+
+
+def _normalize_error(line):
+    """Samakan pesan error yang hanya beda angka (durasi, jumlah) agar bisa dikelompokkan."""
+    return re.sub(r"\d+(?:\.\d+)?", "…", line)
+
+
+def print_report(args, results, elapsed, queues, sampler, trace_records):
+    """Cetak ringkasan; return True jika SLO terpenuhi."""
+    latencies = [r.latency for r in results]
+    errors = sum(not r.ok for r in results)
+    degraded = sum(r.degraded for r in results)
+    error_rate = errors / len(results) if results else 1.0
+
+    print(f"{'='*78}")
+    print(f"Users bersamaan: {args.users}, sesi: {args.sessions}, giliran: {len(results)}, durasi: {elapsed:.1f}s")
+    print(f"Throughput: {len(results) / elapsed:.2f} giliran/detik, {args.sessions / elapsed:.2f} sesi/detik")
+    print(f"Gagal: {errors} ({error_rate:.1%}), jalur degraded: {degraded}")
+
+    print(f"{'='*78}")
+    print(f"{'Latency giliran':<20}{'n':>6}{'mean (ms)':>12}{'p50 (ms)':>11}{'p95 (ms)':>11}{'p99 (ms)':>11}{'max (ms)':>11}")
+    print(f"{'='*78}")
+    groups = defaultdict(list)
+    for r in results:
+        groups[r.kind].append(r.latency)
+    for label, values in [("semua", latencies), *sorted(groups.items())]:
+        print(
+            f"{label:<20}{len(values):>6}{_ms(statistics.fmean(values)):>12.0f}{_ms(percentile(values, 50)):>11.0f}"
+            f"{_ms(percentile(values, 95)):>11.0f}{_ms(percentile(values, 99)):>11.0f}{_ms(max(values)):>11.0f}"
+        )
+
+    if trace_records:
+        stages = defaultdict(list)
+        for record in trace_records:
+            for event in record["events"]:
+                if event["kind"] in ("llm", "tool"):
+                    stages[f"{event['kind']}:{event['name']}"].append(event["duration"])
+        print(f"{'='*78}")
+        print(f"{'Tahap (dari trace)':<36}{'n':>7}{'p50 (ms)':>11}{'p95 (ms)':>11}{'p99 (ms)':>11}")
+        print(f"{'='*78}")
+        for name, values in sorted(stages.items()):
+            print(
+                f"{name:<36}{len(values):>7}{_ms(percentile(values, 50)):>11.0f}"
+                f"{_ms(percentile(values, 95)):>11.0f}{_ms(percentile(values, 99)):>11.0f}"
+            )
+
+    print(f"{'='*78}")
+    print(f"{'Antrean':<24}{'kapasitas':>10}{'n':>7}{'tunggu p50':>11}{'tunggu p95':>11}{'layanan p50':>12}{'kedalaman':>10}{'maks':>6}")
+    print(f"{'':<24}{'':>10}{'':>7}{'(ms)':>11}{'(ms)':>11}{'(ms)':>12}{'rata2':>10}{'':>6}")
+    print(f"{'='*78}")
+    for name, capacity, resource in queues:
+        depths = sampler.samples.get(name) or [0]
+        if resource is not None:
+            measured = (
+                f"{len(resource.waits):>7}{_ms(percentile(resource.waits, 50)):>11.1f}"
+                f"{_ms(percentile(resource.waits, 95)):>11.1f}{_ms(percentile(resource.services, 50)):>12.1f}"
+            )
+        else:
+            # Hanya kedalaman antrean yang di-sample (tidak ada titik ukur per panggilan)
+            measured = f"{'-':>7}{'-':>11}{'-':>11}{'-':>12}"
+        print(f"{name:<24}{capacity or 'bebas':>10}{measured}{statistics.fmean(depths):>10.2f}{max(depths):>6}")
+    print(f"{'='*78}")
+
+    # Error yang dicetak agent/tools per giliran (termasuk giliran yang akhirnya pulih)
+    logged = Counter(_normalize_error(line) for r in results for line in r.errors)
+    if logged:
+        failed_with_log = sum(1 for r in results if not r.ok and r.errors)
+        print(f"Log error/peringatan: {sum(logged.values())} baris di {sum(bool(r.errors) for r in results)} giliran "
+              f"({failed_with_log} dari {errors} giliran gagal punya log)")
+        print(f"{'n':>6}  pesan")
+        for message, count in logged.most_common(ERROR_REPORT_LIMIT):
+            print(f"{count:>6}  {message[:100]}")
+        print(f"{'='*78}")
+
+    p95, p99 = percentile(latencies, 95), percentile(latencies, 99)
+    violations = []
+    if p95 > args.slo_p95:
+        violations.append(f"p95 {p95:.2f}s > SLO {args.slo_p95:.2f}s")
+    if args.slo_p99 is not None and p99 > args.slo_p99:
+        violations.append(f"p99 {p99:.2f}s > SLO {args.slo_p99:.2f}s")
+    if error_rate > args.max_error_rate:
+        violations.append(f"error rate {error_rate:.1%} > {args.max_error_rate:.1%}")
+    if violations:
+        print("SLO TIDAK TERPENUHI: " + "; ".join(violations))
+        return False
+    print(f"SLO terpenuhi (p95 {p95:.2f}s <= {args.slo_p95:.2f}s).")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10, help="sesi chat bersamaan")
+    parser.add_argument("--sessions", type=int, default=None, help="total sesi (default: sama dengan --users)")
+    parser.add_argument("--ramp-up", type=float, default=2.0, help="detik sampai semua user aktif")
+    parser.add_argument("--think-time", type=float, default=DEFAULT_THINK_TIME, help="jeda rata-rata antar giliran (detik)")
+    parser.add_argument("--llm-latency", type=float, default=DEFAULT_LLM_LATENCY, help="median latency per panggilan LLM (detik)")
+    parser.add_argument("--llm-concurrency", type=int, default=0, help="panggilan LLM paralel maksimum (0 = tanpa batas)")
+    parser.add_argument("--embedding-latency", type=float, default=DEFAULT_EMBEDDING_LATENCY)
+    parser.add_argument("--embedding-concurrency", type=int, default=0)
+    parser.add_argument("--search-latency", type=float, default=DEFAULT_SEARCH_LATENCY)
+    parser.add_argument("--search-concurrency", type=int, default=0)
+    parser.add_argument("--jitter", type=float, default=DEFAULT_JITTER, help="sigma log-normal untuk semua latency palsu")
+    parser.add_argument("--db", default=movie_agent.SQL_DB_PATH, help="database SQLite untuk tool SQL")
+    parser.add_argument("--data", default=ARTIFACT_PATH, help="artifact dataset untuk Qdrant in-memory")
+    parser.add_argument("--no-trace", action="store_true", help="matikan trace (tanpa statistik per tahap)")
+    parser.add_argument("--slo-p95", type=float, default=DEFAULT_SLO_P95, help="SLO latency giliran p95 (detik)")
+    parser.add_argument("--slo-p99", type=float, default=None, help="SLO latency giliran p99 (detik, opsional)")
+    parser.add_argument("--max-error-rate", type=float, default=DEFAULT_MAX_ERROR_RATE)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--verbose", action="store_true", help="tampilkan log tools/agent")
+    args = parser.parse_args()
+    args.sessions = args.sessions or args.users
+    random.seed(args.seed)
+
+    # Pasang dependensi palsu ke komponen lazy yang dipakai movie_agent (agent dibuat dari get_llm)
+    llm_resource = LimitedResource("llm (provider)", args.llm_concurrency)
+    embedding_resource = LimitedResource("embedding", args.embedding_concurrency)
+    search_resource = LimitedResource("qdrant search", args.search_concurrency)
+    embeddings = SlowFakeEmbeddings(embedding_resource, args.embedding_latency, args.jitter)
+    movie_agent.configure(sql_db_path=args.db)
+    set_resource("llm", ScriptedChatModel(latency=args.llm_latency, jitter=args.jitter, resource=llm_resource))
+    set_resource("embeddings", embeddings)
+    print("Menyiapkan Qdrant in-memory dan agent...")
+    set_resource("qdrant", build_vector_store(embeddings, search_resource, args.search_latency, args.jitter, args.data))
+    movie_agent.get_agent()
+    movie_agent.preload_sql_tool()
+    engine = get_readonly_engine(args.db)
+
+    queues = [
+        (llm_resource.name, llm_resource.capacity, llm_resource),
+        (embedding_resource.name, embedding_resource.capacity, embedding_resource),
+        (search_resource.name, search_resource.capacity, search_resource),
+        ("hedged-call executor", HEDGE_WORKERS, None),
+        ("sql pool (terpakai)", POOL_SIZE, None),
+    ]
+    sampler = QueueSampler({
+        llm_resource.name: lambda: llm_resource.waiting,
+        embedding_resource.name: lambda: embedding_resource.waiting,
+        search_resource.name: lambda: search_resource.waiting,
+        "hedged-call executor": pending_hedged_calls,
+        "sql pool (terpakai)": lambda: engine.pool.checkedout(),
+    })
+
+    exporter = MemoryExporter()
+    tracer = Tracer(None if args.no_trace else exporter, sample_rate=1.0)
+
+    print(f"Menjalankan {args.sessions} sesi dengan {args.users} user bersamaan...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = ConversationStore(os.path.join(tmp_dir, "conversations.db"))
+        sampler.start()
+        # Log per giliran dari tools/agent ditangkap per giliran (untuk laporan error) dan
+        # hanya ikut dicetak jika --verbose
+        with contextlib.redirect_stdout(TurnOutputCapture(sys.stdout if args.verbose else None)):
+            results, elapsed = run_load(args, store, tracer)
+        sampler.stop()
+        tracer.flush(timeout=30)
+        store.close()
+
+    return 0 if print_report(args, results, elapsed, queues, sampler, exporter.records) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
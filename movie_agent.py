@@ -0,0 +1,597 @@
+"""
+Agent utama Absolute Cinema (tools RAG + SQL, system prompt, dan satu giliran chat).
+
+Dipisah dari main.py agar bisa di-import tanpa Streamlit: main.py memakai modul ini
+untuk UI chat, dan loadtest.py menjalankan agent dan tools yang sama secara headless
+(dengan model, embedding, dan Qdrant palsu yang dipasang lewat startup_profile.set_resource).
+"""
+
+import os
+
+from startup_profile import lazy_resource
+
+# Parser constraint (tahun, genre, rating, vote) untuk filter payload Qdrant
+from movie_filters import parse_question_filters, build_qdrant_filter, build_sql_where, describe_filters
+
+# Kontrol tail-latency: deadline per tahap, hedged request, circuit breaker per dependensi
+from resilience import (
+    AnswerCache, CircuitOpenError, check_budget, get_breaker, hedged_call, is_dependency_failure,
+    stage_timeout, turn_budget,
+    EMBEDDING_TIMEOUT, VECTOR_SEARCH_TIMEOUT, LLM_TIMEOUT, TURN_TIMEOUT,
+)
+
+# Cache thumbnail poster lokal (diisi saat setup.py, dilayani dari folder static/)
+from poster_cache import local_poster_url, localize_poster_tags
+
+# BAGIAN 1: KONFIGURASI & KOMPONEN LAZY
+# Konstanta aplikasi
+# - Nama koleksi Qdrant dan path database SQLite disimpan di sini.
+QDRANT_COLLECTION_NAME = "fadhlanrio"
+SQL_DB_PATH = "movies.db"
+
+# Kredensial (default dari environment; main.py mengisinya dari Streamlit secrets lewat configure)
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+QDRANT_URL = os.getenv("QDRANT_URL")
+QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
+
+GREETING = "Halo! Aku Absolute Cinema. Ada yang bisa kubantu? Kamu bisa tanya rekomendasi film atau data film spesifik!"
+DEGRADED_ANSWER = "Maaf, layanan sedang terganggu. Coba tanya lagi sebentar lagi ya! 🙏"
+
+
+def configure(openai_api_key=None, qdrant_url=None, qdrant_api_key=None, sql_db_path=None):
+    """Set kredensial / path database sebelum komponen lazy pertama kali dibuat."""
+    global OPENAI_API_KEY, QDRANT_URL, QDRANT_API_KEY, SQL_DB_PATH
+    OPENAI_API_KEY = openai_api_key or OPENAI_API_KEY
+    QDRANT_URL = qdrant_url or QDRANT_URL
+    QDRANT_API_KEY = qdrant_api_key or QDRANT_API_KEY
+    SQL_DB_PATH = sql_db_path or SQL_DB_PATH
+
+
+# LLM & Embedding initialization
+# - Konfigurasi model LLM (ChatOpenAI) dan embeddings (OpenAIEmbeddings).
+# - Gunakan API key dari environment.
+# - Setiap client punya deadline sendiri; retry embedding ditangani hedged_call (bukan retry internal client).
+# - Timeout setiap panggilan LLM dipotong ke sisa budget giliran (resilience.turn_budget).
+# - Dibuat lazy sekali per proses (lihat startup_profile.lazy_resource).
+# Inisialisasi model LLM dan Embedding
+@lazy_resource("llm")
+def get_llm():
+    from langchain_openai import ChatOpenAI
+
+    class DeadlineChatOpenAI(ChatOpenAI):
+        """ChatOpenAI dengan timeout per request = min(LLM_TIMEOUT, sisa budget giliran)."""
+
+        # Timeout karena sisa budget giliran habis di-raise ulang sebagai BudgetExhausted
+        # (lewat check_budget) agar tidak dihitung sebagai kegagalan OpenAI oleh breaker.
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            kwargs["timeout"] = stage_timeout(LLM_TIMEOUT)
+            try:
+                return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            except Exception:
+                check_budget()
+                raise
+
+        def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+            kwargs["timeout"] = stage_timeout(LLM_TIMEOUT)
+            try:
+                yield from super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+            except Exception:
+                check_budget()
+                raise
+
+    return DeadlineChatOpenAI(
+        model="gpt-4o-mini",
+        api_key=OPENAI_API_KEY,
+        temperature=0,
+        timeout=LLM_TIMEOUT,
+        max_retries=1
+    )
+
+@lazy_resource("embeddings")
+def get_embeddings():
+    from langchain_openai import OpenAIEmbeddings
+    return OpenAIEmbeddings(
+        model="text-embedding-3-small",
+        api_key=OPENAI_API_KEY,
+        timeout=EMBEDDING_TIMEOUT,
+        max_retries=0)
+
+# Resource yang dipakai ulang antar rerun (satu per proses)
+# - Qdrant store dibuat sekali dengan timeout per request, bukan di setiap panggilan tool.
+# - Cache jawaban dipakai sebagai jalur degraded saat dependensi remote tidak sehat.
+@lazy_resource("qdrant")
+def get_qdrant_store():
+    from langchain_qdrant import QdrantVectorStore
+    return QdrantVectorStore.from_existing_collection(
+        embedding=get_embeddings(),
+        collection_name=QDRANT_COLLECTION_NAME,
+        url=QDRANT_URL,
+        api_key=QDRANT_API_KEY,
+        timeout=int(VECTOR_SEARCH_TIMEOUT)
+    )
+
+# Cache jawaban sukses terakhir (satu per proses), dipakai sebagai jalur degraded
+# saat dependensi remote tidak sehat.
+# - "rag": hasil tool RAG per pertanyaan (tidak bergantung sesi, isinya data film).
+# - "agent": jawaban akhir agent, dikunci per sesi + pertanyaan sekarang (lihat agent_cache_key)
+#   agar jawaban follow-up satu user tidak pernah dilayani ke user lain. Key tidak memuat
+#   riwayat (yang selalu bertambah tiap giliran) agar pertanyaan berulang di sesi yang sama
+#   benar-benar bisa dilayani dari cache.
+answer_caches = {"rag": AnswerCache(), "agent": AnswerCache()}
+
+# BAGIAN 2: DEFINISI TOOLS
+# Overview
+# - Tool adalah fungsi yang dipakai agent untuk mengambil data.
+# - Di aplikasi ini ada dua tool: RAG (Qdrant) untuk rekomendasi kualitatif dan SQL untuk data faktual.
+
+# Tool RAG — get_movie_recommendations
+# - Tujuan: cari film berdasarkan tema/plot/kemiripan (kualitatif).
+# - Input: pertanyaan natural language.
+# - Constraint terstruktur (tahun, genre, rating, vote) diurai dari pertanyaan dan dikirim
+#   sebagai filter Qdrant, sehingga payload index memangkas kandidat sebelum scoring.
+# - Output: string terformat dengan metadata film, termasuk tag khusus poster `||POSTER||URL`
+#   (URL thumbnail lokal jika poster sudah di-cache, URL Amazon asli jika belum).
+# - Embedding dan vector search dijalankan dengan deadline + hedged request, masing-masing
+#   lewat circuit breaker. Jika OpenAI/Qdrant tidak sehat, tool memakai jalur degraded:
+#   jawaban cache untuk pertanyaan yang sama, atau pencarian lokal di movies.db.
+def search_vector_store(question, qdrant_filter, k=3):
+    """
+    Embedding + vector search dengan deadline, hedging, dan circuit breaker per dependensi.
+    Budget giliran dicek sebelum masuk breaker: budget yang habis tidak dihitung sebagai kegagalan.
+    """
+    check_budget()
+    query_vector = get_breaker("openai-embeddings").call(
+        hedged_call, get_embeddings().embed_query, question, timeout=EMBEDDING_TIMEOUT
+    )
+    check_budget()
+    return get_breaker("qdrant").call(
+        lambda: hedged_call(
+            get_qdrant_store().similarity_search_by_vector, query_vector, k=k, filter=qdrant_filter,
+            timeout=VECTOR_SEARCH_TIMEOUT
+        )
+    )
+
+# Kata umum di pertanyaan yang tidak membedakan film satu dengan lainnya
+LOCAL_SEARCH_STOPWORDS = {
+    "film", "filmnya", "movie", "movies", "yang", "dan", "atau", "dengan", "untuk", "dari", "tentang",
+    "mirip", "seperti", "kayak", "rekomendasi", "rekomendasikan", "cari", "carikan", "kasih", "tolong",
+    "dong", "donk", "sih", "nih", "aja", "saja", "ada", "apa", "mau", "ingin", "pengen", "bagus", "terbaik",
+    "the", "and", "with", "about", "like", "similar", "recommend", "best", "good",
+}
+LOCAL_SEARCH_COLUMNS = ("title", "genre", "overview", "director", "star1", "star2", "star3")
+
+def search_keywords(question):
+    """Kata kunci untuk pencarian lokal: huruf kecil, tanpa tanda baca dan stopword."""
+    import re
+    words = re.findall(r"\w+", question.lower())
+    return list(dict.fromkeys(word for word in words if len(word) > 2 and word not in LOCAL_SEARCH_STOPWORDS))
+
+def search_movies_locally(question, constraints, k=3):
+    """
+    Jalur degraded: cari film di movies.db dengan filter + kecocokan kata kunci, tanpa embedding/Qdrant.
+    Skor kata kunci dihitung di SQLite (kecocokan judul berbobot lebih) dan hanya k baris teratas
+    yang diambil, sehingga seluruh tabel ikut dinilai (tidak terpotong row cap sql_guard).
+    """
+    from langchain_core.documents import Document
+    from sqlalchemy import text
+    from sql_guard import get_readonly_engine
+
+    where, params = build_sql_where(constraints)
+    haystack = " || ' ' || ".join(f"coalesce({column}, '')" for column in LOCAL_SEARCH_COLUMNS)
+    score_terms = []
+    for i, keyword in enumerate(search_keywords(question)):
+        params[f"keyword_{i}"] = keyword
+        score_terms.append(
+            f"2 * (instr(lower(coalesce(title, '')), :keyword_{i}) > 0) + (instr(lower({haystack}), :keyword_{i}) > 0)"
+        )
+    score = " + ".join(score_terms) or "0"
+    params["k"] = k
+    query = (
+        "SELECT title, released_year, imdb_rating, genre, overview, poster_link "
+        f"FROM movies {where} ORDER BY ({score}) DESC, imdb_rating DESC LIMIT :k"
+    )
+    with get_readonly_engine(SQL_DB_PATH).connect() as conn:
+        rows = conn.execute(text(query), params).mappings().fetchall()
+
+    return [
+        Document(
+            page_content=f"Sinopsis: {row['overview']}",
+            metadata={
+                'title': row['title'],
+                'year': row['released_year'],
+                'rating': row['imdb_rating'],
+                'genre': row['genre'],
+                'poster': row['poster_link']
+            }
+        ) for row in rows
+    ]
+
+def get_movie_recommendations(question: str) -> str:
+    """
+    Gunakan alat ini untuk mencari rekomendasi film berdasarkan deskripsi plot, 
+    tema, genre, atau film lain yang mirip. 
+    Input harus berupa pertanyaan dalam bahasa natural tentang film yang dicari.
+    Contoh: 'Cari film tentang perjalanan waktu' atau 'Rekomendasi film mirip The Dark Knight'.
+    """
+    print(f"\n>> Using RAG Tool for movie recommendations: '{question}'")
+    # Pushdown constraint ke Qdrant (jika ada); fallback ke pencarian tanpa filter bila kosong
+    constraints = parse_question_filters(question)
+    qdrant_filter = build_qdrant_filter(constraints)
+    degraded = False
+    try:
+        results = search_vector_store(question, qdrant_filter)
+        if qdrant_filter is not None and not results:
+            print(f">> Tidak ada film yang cocok dengan filter ({describe_filters(constraints)}), mencari tanpa filter.")
+            results = search_vector_store(question, None)
+            qdrant_filter = None
+    except Exception as e:
+        # Jalur degraded: jawaban cache untuk pertanyaan yang sama, lalu pencarian lokal
+        reason = "circuit open" if isinstance(e, CircuitOpenError) else f"{type(e).__name__}: {e}"
+        print(f">> Vector search tidak tersedia ({reason}), memakai jalur degraded.")
+        cached_answer = answer_caches["rag"].get(question)
+        if cached_answer:
+            return cached_answer
+        results = search_movies_locally(question, constraints)
+        degraded = True
+    formatted_results = "\n\n".join(
+        [
+            f"Judul: {doc.metadata.get('title', 'N/A')}\n"
+            f"Tahun: {doc.metadata.get('year', 'N/A')}\n"
+            f"Rating: {doc.metadata.get('rating', 'N/A')}\n"
+            f"Genre: {doc.metadata.get('genre', 'N/A')}\n"
+            f"Sinopsis: {doc.page_content.split('Sinopsis: ')[-1]}"
+            f"||POSTER||{local_poster_url(doc.metadata.get('poster', 'No Poster URL'))}"
+            for doc in results
+        ]
+    )
+    if degraded:
+        header = "Pencarian semantik sedang tidak tersedia, berikut film dari database lokal yang paling cocok:"
+    elif qdrant_filter is not None:
+        header = f"Berikut adalah {len(results)} film yang paling relevan ({describe_filters(constraints)}):"
+    else:
+        header = "Berikut adalah 3 film yang paling relevan berdasarkan pencarianmu:"
+    answer = f"{header}\n{formatted_results}"
+    if not degraded:
+        answer_caches["rag"].put(question, answer)
+    return answer
+
+# Tool SQL — get_factual_movie_data
+# Tujuan: jawab pertanyaan faktual/kuantitatif (rating, tahun, sutradara, dsb.)
+# Pendekatan:
+#   1) Buat koneksi SQLDatabase (CachedSQLDatabase: query SELECT berulang dilayani dari cache)
+#      di atas engine read-only ber-pool dari sql_guard (query cartesian ditolak, timeout & row cap)
+#   2) Inisialisasi SQLDatabaseToolkit dan ambil tools SQL
+#   3) Definisikan system prompt khusus SQL (guidelines untuk pembuatan query, pembatasan, dan instruksi Poster)
+#   4) Buat sub-agent khusus untuk menjalankan langkah pembuatan query dan eksekusi
+#   5) Jalankan sub-agent, ambil jawaban akhir dan, jika ada, query SQL yang dieksekusi
+# Output: gabungan jawaban dan delimiter `||SQL_QUERY||` diikuti SQL query (atau pesan error + delimiter).
+def get_factual_movie_data(question: str) -> str:
+    """
+    Gunakan alat ini untuk menjawab pertanyaan spesifik dan faktual tentang data film, 
+    seperti rating, tahun rilis, sutradara, pendapatan (gross), jumlah vote, dan durasi. 
+    Sangat baik untuk pertanyaan yang melibatkan angka, statistik, perbandingan, atau daftar.
+    Contoh: 'top 5 film rating tertinggi 2019', 'rata-rata pendapatan film Christopher Nolan', 'total film di atas 150 menit'.
+    """ 
+    print(f"\n>> Using SQL Tool for factual movie data: '{question}'")
+    from langchain.agents import create_agent
+    from langchain_community.agent_toolkits.sql.toolkit import SQLDatabaseToolkit
+    from sql_cache import CachedSQLDatabase
+    from sql_guard import get_readonly_engine
+    llm = get_llm()
+    
+    db = CachedSQLDatabase(get_readonly_engine(SQL_DB_PATH))
+    
+    # 1. Create SQL toolkit
+    toolkit = SQLDatabaseToolkit(db=db, llm=llm)
+    
+    # 2. Get the tools from the toolkit
+    sql_tools = toolkit.get_tools()
+
+    # 3. Buat system prompt khusus untuk SQL
+    # DISESUAIKAN: Nama kolom sesuai dengan struktur database baru
+    sql_system_prompt = """
+    You are an agent designed to interact with a SQL database.
+    Given an input question, create a syntactically correct {dialect} query to run,
+    then look at the results of the query and return the answer. Unless the user
+    specifies a specific number of examples they wish to obtain, always limit your
+    query to at most {top_k} results.
+
+    You can order the results by a relevant column to return the most interesting
+    examples in the database. Never query for all the columns from a specific table,
+    only ask for the relevant columns given the question.
+
+    IMPORTANT - Database Schema:
+    The movies table has the following columns:
+    - id (INTEGER PRIMARY KEY)
+    - poster_link (TEXT) - URL poster film
+    - title (TEXT) - Judul film
+    - released_year (INTEGER) - Tahun rilis
+    - certificate (TEXT) - Rating usia
+    - runtime (INTEGER) - Durasi dalam menit
+    - genre (TEXT) - Genre film
+    - imdb_rating (REAL) - Rating IMDb
+    - overview (TEXT) - Sinopsis film
+    - meta_score (REAL) - Meta score
+    - director (TEXT) - Sutradara
+    - star1, star2, star3, star4 (TEXT) - Pemeran utama
+    - no_of_votes (INTEGER) - Jumlah vote
+    - gross (REAL) - Pendapatan box office
+
+    When you query for data about specific movies (e.g., title, imdb_rating), 
+    YOU MUST ALWAYS ALSO SELECT the 'poster_link' column.
+    In your final natural language answer, after mentioning a movie, 
+    YOU MUST include its poster URL, prefixed with the special tag '||POSTER||'.
+    Contoh Jawaban: "Filmnya adalah The Dark Knight. ||POSTER||http://url.com/poster.jpg"
+
+    You MUST double check your query before executing it. If you get an error while
+    executing a query, rewrite the query and try again.
+    
+    DO NOT make any DML statements (INSERT, UPDATE, DELETE, DROP etc.) to the
+    database.
+    
+    To start you should ALWAYS look at the tables in the database to see what you
+    can query. Do NOT skip this step.
+    Then you should query the schema of the most relevant tables.
+    """.format(
+        dialect=db.dialect,
+        top_k=5,
+    )
+
+    # 4. Create a dedicated "sub-agent" for SQL queries
+    sql_agent_runnable = create_agent(
+        llm,
+        sql_tools,
+        system_prompt=sql_system_prompt,
+    )
+    
+    try:
+        # 5. Jalankan sub-agent SQL langkah demi langkah; berhenti jika budget giliran habis
+        #    (panggilan LLM dan query SQL di dalamnya juga memakai sisa budget yang sama)
+        response_state = None
+        for response_state in sql_agent_runnable.stream(
+            {"messages": [{"role": "user", "content": question}]},
+            stream_mode="values",
+        ):
+            check_budget()
+        
+        # Extract final answer from last message
+        final_message = response_state["messages"][-1]
+        # Ganti URL poster Amazon dengan thumbnail lokal yang sudah di-cache
+        answer = localize_poster_tags(final_message.content)
+        
+        # Try to extract SQL query from tool messages
+        sql_query = ""
+        for msg in response_state["messages"]:
+            if hasattr(msg, "type") and msg.type == "tool":
+                content = msg.content
+                # Look for SQL query patterns in content
+                if "SELECT" in content.upper():
+                    # Extract the SQL query
+                    import re
+                    match = re.search(r'(SELECT.*?;)', content, re.IGNORECASE | re.DOTALL)
+                    if match:
+                        sql_query = match.group(1)
+                        break
+        
+        # Return answer with SQL query delimiter
+        if sql_query:
+            return f"{answer}\n||SQL_QUERY||{sql_query}"
+        else:
+            return f"{answer}\n||SQL_QUERY||Query extraction failed"
+            
+    except Exception as e:
+        error_msg = f"Error executing SQL query: {str(e)}"
+        print(error_msg)
+        return f"{error_msg}\n||SQL_QUERY||Error occurred"
+
+# BAGIAN 3: DEFINISI AGENT UTAMA
+# Definisi tools yang digunakan
+# - Gabungkan tools RAG dan SQL ke dalam list (dibungkus `tool` saat agent dibuat, lihat get_agent).
+tools = [get_movie_recommendations, get_factual_movie_data]
+
+# System prompt untuk agent utama
+# - Aturan dasar: pilih tool yang tepat, routing logic, instruksi format jawaban (terutama poster), instruksi untuk poster di tabel, dan lain-lain.
+# - Atur karakter AI sebagai asisten film yang ramah.
+SYSTEM_PROMPT = """
+Kamu adalah Absolute Cinema, seorang Cinephile Buddy yang ceria dan penuh pengetahuan dan sering menggunakan bahasa slang yang ceria tapi sopan seperti (wah, keren, mantap banget lu bro!, anjayy, damnn, sabi banget, literally the best, gokil abis, auto nonton, vibe-nya dapet banget, dan yang lainnya).
+Tugasmu adalah membantu pengguna dalam menemukan rekomendasi film yang sesuai dengan keinginan mereka atau menjawab pertanyaan faktual tentang film.
+
+Kamu memiliki dua alat (tools) utama:
+1. **get_movie_recommendations**: Untuk mencari film berdasarkan tema, plot, genre, atau kemiripan dengan film lain. 
+   Gunakan ini ketika user menanyakan "film seperti X", "film tentang Y", atau pertanyaan terbuka tentang rekomendasi.
+
+2. **get_factual_movie_data**: Untuk menjawab pertanyaan faktual dan kuantitatif seperti rating, tahun rilis, pendapatan, 
+   sutradara, durasi, dan statistik. Gunakan ini untuk pertanyaan seperti "top 5 film rating tertinggi", 
+   "rata-rata pendapatan film Christopher Nolan", "film di atas 150 menit", dll.
+
+**Aturan Penting:**
+- SELALU pilih tool yang PALING SESUAI dengan pertanyaan user.
+- Jika user menanyakan rekomendasi atau kemiripan film → gunakan `get_movie_recommendations`.
+- Jika user menanyakan data faktual, angka, statistik, perbandingan → gunakan `get_factual_movie_data`.
+- JANGAN pernah memilih kedua tool sekaligus untuk satu pertanyaan.
+
+**Format Poster:**
+- Output dari tools akan menyertakan tag khusus `||POSTER||URL` untuk setiap film.
+- Kamu HARUS mengubah format ini menjadi tabel markdown dengan poster sebagai gambar.
+- Format yang benar:
+* **Contoh Tabel YANG HARUS DIIKUTI:**
+| Poster | Film | Tahun | Rating | Kenapa Wajib Tonton? |
+|---|---|---|---|---|
+| ![Poster](httpsMARVEL_POSTER_URL.jpg) | Avengers: Endgame | 2019 | 8.4 | Puncak epik dari saga Marvel yang emosional dan penuh aksi. |
+| ![Poster](INTERSTELLAR_POSTER_URL.jpg) | Interstellar | 2014 | 8.6 | Sci-fi epik tentang waktu dan cinta keluarga. Visualnya luar biasa. |
+
+**Contoh Baik:**
+User: "Film mirip Inception"
+Agent: [Menggunakan get_movie_recommendations]
+Output: Tabel dengan poster sebagai gambar
+
+User: "Top 5 film rating tertinggi"
+Agent: [Menggunakan get_factual_movie_data]
+Output: Tabel dengan poster sebagai gambar
+
+**Gaya Komunikasi:**
+
+Ramah dan antusias dengan sentuhan bahasa gaul anak Jaksel yang natural
+Gunakan bahasa Indonesia yang santai tapi tetap sopan (campur bahasa Inggris oke banget!)
+Berikan insight menarik tentang film jika relevan
+Jangan bertele-tele, langsung to the point
+Sesekali pakai emoji yang relevan biar makin hidup (🎬🍿✨🔥💯)
+
+FITUR BARU - Follow-up Questions yang Asik:
+Setelah memberikan jawaban atau rekomendasi film, kamu HARUS memberikan 2-3 follow-up questions yang menarik, interaktif, dan gaul untuk membuat percakapan lebih engaging. Follow-up questions ini harus:
+
+Relevan dengan konteks film yang baru dibahas
+Mengundang user untuk eksplorasi lebih lanjut
+Natural dan terasa seperti ngobrol sama teman
+Variatif - jangan monoton atau template banget
+
+Contoh Follow-up Questions yang Oke:
+
+"Btw bro, lu lebih suka plot twist yang mind-blowing atau yang wholesome aja? 🤔"
+"Eh, udah nonton yang mana aja nih dari list gue? Penasaran reaksi lu gimana! 🍿"
+"Kalo misalnya lu lagi vibes mellow gitu, mau gue rekomenin yang feel-good movie nggak? ✨"
+"Dari genre sci-fi gini, lu team hard sci-fi kayak Interstellar atau soft sci-fi kayak Her? 🚀"
+"Pengen tau nih, director favorit lu siapa? Siapa tau gue bisa kasih hidden gems dari dia! 🎬"
+"Lu tipe yang suka nonton sendirian tengah malem atau rame-rame sama temen? Soalnya vibe-nya beda banget! 😄"
+
+Template Follow-up (Sesuaikan dengan Konteks dan jangan terus mengulang kalimat yang sama, gunakan kalimat yang lain):
+Setelah jawaban utama, tambahkan bagian seperti:
+
+[Insert 2-3 follow-up questions yang natural dan gaul sesuai konteks]
+
+Contoh Implementasi Lengkap:
+User: "Film mirip Inception dong"
+Agent:
+"Wah, Inception emang absolute cinema banget sih! 🔥 Oke gue kasih rekomendasi yang vibe-nya mirip - mind-bending, plot twist gila, dan bikin lu mikir sampe besok pagi haha!
+[Tool: get_movie_recommendations]
+[Output tabel dengan poster]
+Nah itu dia bro, semua film-nya literally bakal blow your mind! 💯
+Btw nih:
+
+Dari list di atas, lu udah nonton yang mana aja? Pengen tau reaksi lu gimana! 🍿
+Kalo gue boleh tau, lu lebih suka yang sci-fi heavy atau yang psychological thriller gitu? Biar next time gue bisa kasih rekomendasi yang makin spot on! 🎯"
+
+
+Tips Tambahan:
+
+- Jangan paksa follow-up di setiap respons kalo user lagi nanya simple banget
+- Baca vibe user - kalo mereka lagi serius, tone-nya adjust dikit
+- Sesekali kasih fun facts atau trivia tentang film biar makin seru!
+- Jangan sering mengulang follow up yang sama!! gunakan kalimat yang lainnya!!
+
+Sekarang, bantu user dengan pertanyaan mereka!
+"""
+
+# Buat agent utama (runnable)
+# - Gunakan create_agent dengan llm, tools, dan system_prompt di atas.
+# - Hasil: agent_runnable yang dapat dipanggil / di-stream.
+# - Dibuat lazy sekali per proses (warm-up di background setelah UI tampil, atau saat chat pertama).
+@lazy_resource("agent")
+def get_agent():
+    from langchain.tools import tool
+    from langchain.agents import create_agent
+    return create_agent(
+        get_llm(),
+        [tool(fn) for fn in tools],
+        system_prompt=SYSTEM_PROMPT
+    )
+
+
+def preload_sql_tool():
+    """Import modul tool SQL dan buka pool read-only lebih awal."""
+    import importlib
+    # Warm-up import saja (toolkit SQL + cache hasil query); dipakai nanti oleh get_factual_movie_data
+    importlib.import_module("langchain_community.agent_toolkits.sql.toolkit")
+    importlib.import_module("sql_cache")
+    from sql_guard import get_readonly_engine
+    get_readonly_engine(SQL_DB_PATH)
+
+# BAGIAN 4: SATU GILIRAN CHAT
+# - Dipakai oleh UI Streamlit (main.py) dan load test headless (loadtest.py).
+# - Konteks untuk agent = hot window sesi dari conversation store, bukan seluruh riwayat.
+def to_langchain_messages(history):
+    """Convert riwayat chat (dict role/content) ke objek BaseMessage LangChain."""
+    from langchain_core.messages import HumanMessage, AIMessage
+    return [
+        HumanMessage(content=msg["content"]) if msg["role"] == "user" else AIMessage(content=msg["content"])
+        for msg in history
+    ]
+
+def agent_cache_key(session_id, user_input):
+    """Key cache jawaban agent: session id + pertanyaan sekarang (dinormalisasi oleh AnswerCache)."""
+    return f"{session_id}\x1e{user_input}"
+
+def run_agent_turn(messages, user_input, config=None, session_id=None, turn_timeout=TURN_TIMEOUT):
+    """
+    Stream agent untuk satu giliran lewat circuit breaker 'openai-chat', dalam budget
+    waktu `turn_timeout` yang dibagi semua tahap (LLM, tool RAG, sub-agent SQL).
+    Jika OpenAI sedang tidak sehat (breaker open), budget habis, atau agent gagal, jawaban
+    diambil dari cache untuk pertanyaan yang sama di sesi yang sama; jika tidak ada,
+    dipakai DEGRADED_ANSWER.
+    Return dict: answer, ok, tool_call_info, tool_output, sql_query.
+    """
+    tool_call_info = None
+    full_tool_output = ""
+    sql_query = None
+    last_valid_state = None
+
+    cache_key = agent_cache_key(session_id, user_input)
+    chat_breaker = get_breaker("openai-chat")
+    if chat_breaker.allow():
+        try:
+            with turn_budget(turn_timeout):
+                stream = get_agent().stream(
+                    {"messages": messages},
+                    stream_mode="values",
+                    config=config
+                )
+
+                for chunk in stream:
+                    # Budget giliran habis -> BudgetExhausted, dialihkan ke jalur degraded
+                    check_budget()
+                    if "messages" in chunk:
+                        last_valid_state = chunk
+                        last_message = chunk["messages"][-1]
+
+                        # Capture tool call information when the agent decides to use a tool
+                        if hasattr(last_message, "tool_calls") and last_message.tool_calls:
+                            call = last_message.tool_calls[0]
+                            tool_call_info = {
+                                "name": call['name'],
+                                "args": call['args']
+                            }
+
+                        # Capture raw tool output if the message type is 'tool'
+                        if hasattr(last_message, "type") and last_message.type == "tool": # LangChain message objects have a .type attribute
+                            full_tool_output = last_message.content
+            chat_breaker.record_success()
+        except Exception as e:
+            # Budget habis (mis. sub-agent SQL lambat) dan error lokal bukan tanda OpenAI tidak sehat
+            if is_dependency_failure(e):
+                chat_breaker.record_failure()
+            else:
+                chat_breaker.release()
+            print(f"Error saat menjalankan agent: {type(e).__name__}: {e}")
+            last_valid_state = None
+
+    # Ambil jawaban akhir (setelah stream selesai)
+    if last_valid_state:
+        answer = last_valid_state["messages"][-1].content
+        answer_caches["agent"].put(cache_key, answer)
+    else:
+        answer = answer_caches["agent"].get(cache_key) or DEGRADED_ANSWER
+
+    # Parse SQL query from tool output if SQL tool was used
+    if tool_call_info and tool_call_info['name'] == 'get_factual_movie_data':
+        if "||SQL_QUERY||" in full_tool_output:
+            sql_query = full_tool_output.split("||SQL_QUERY||")[1]
+        else:
+            sql_query = "Query tidak dapat diekstrak dari tool."
+
+    return {
+        "answer": answer,
+        "ok": last_valid_state is not None,
+        "tool_call_info": tool_call_info,
+        "tool_output": full_tool_output,
+        "sql_query": sql_query,
+    }
@@ -0,0 +1,291 @@
+"""
+Parser constraint terstruktur dari pertanyaan user untuk tool RAG.
+
+Pertanyaan seperti "film horor tahun 2000-an dengan rating di atas 8.5" diurai
+menjadi rentang tahun, daftar genre, dan ambang rating/vote. Rentang angka
+disimpan sebagai dict operator seperti qdrant `models.Range`
+(mis. {"gte": 2000, "lte": 2009} atau {"gt": 8.5}). Constraint ini
+kemudian dikirim ke Qdrant sebagai filter payload sehingga payload index
+(lihat setup.py) memangkas kandidat sebelum similarity scoring. Padanan SQL-nya
+(build_sql_where) dipakai pencarian lokal saat Qdrant tidak tersedia.
+"""
+
+import re
+
+# Nama field payload di Qdrant
+# - QdrantVectorStore (langchain_qdrant) menyimpan metadata dokumen di bawah key 'metadata'.
+# - Dipakai bersama oleh setup.py (pembuatan payload index) dan main.py (filter saat query).
+YEAR_FIELD = "metadata.year"
+RATING_FIELD = "metadata.rating"
+VOTES_FIELD = "metadata.votes"
+GENRE_FIELD = "metadata.genre"
+
+# Mapping kata kunci genre (Indonesia/Inggris) ke nama genre di dataset IMDb
+GENRE_KEYWORDS = {
+    "horor": "Horror",
+    "horror": "Horror",
+    "komedi": "Comedy",
+    "comedy": "Comedy",
+    "lucu": "Comedy",
+    "aksi": "Action",
+    "action": "Action",
+    "laga": "Action",
+    "drama": "Drama",
+    "romantis": "Romance",
+    "romance": "Romance",
+    "romansa": "Romance",
+    "animasi": "Animation",
+    "animation": "Animation",
+    "kartun": "Animation",
+    "petualangan": "Adventure",
+    "adventure": "Adventure",
+    "fiksi ilmiah": "Sci-Fi",
+    "sci-fi": "Sci-Fi",
+    "scifi": "Sci-Fi",
+    "thriller": "Thriller",
+    "kriminal": "Crime",
+    "crime": "Crime",
+    "misteri": "Mystery",
+    "mystery": "Mystery",
+    "fantasi": "Fantasy",
+    "fantasy": "Fantasy",
+    "perang": "War",
+    "war": "War",
+    "biografi": "Biography",
+    "biopik": "Biography",
+    "biography": "Biography",
+    "sejarah": "History",
+    "history": "History",
+    "musikal": "Musical",
+    "musical": "Musical",
+    "musik": "Music",
+    "music": "Music",
+    "keluarga": "Family",
+    "family": "Family",
+    "olahraga": "Sport",
+    "sport": "Sport",
+    "western": "Western",
+    "koboi": "Western",
+    "film-noir": "Film-Noir",
+    "noir": "Film-Noir",
+}
+
+# Kata pembanding untuk ambang batas (rating / vote) -> operator Range
+# - "di atas 8" berarti > 8 (gt), "minimal 8" berarti >= 8 (gte), dst.
+_COMPARATORS = {
+    "gte": r"(?:minimal|min\.?|paling sedikit|setidaknya|at least|>=)",
+    "gt": r"(?:di atas|diatas|lebih dari|lebih tinggi dari|above|over|>)",
+    "lte": r"(?:maksimal|max\.?|paling banyak|at most|<=)",
+    "lt": r"(?:di bawah|dibawah|kurang dari|lebih rendah dari|below|under|<)",
+}
+_RANGE_OPERATORS = {"gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+# Angka dengan pemisah ribuan berulang ("1.000.000", "1,500,000") atau desimal ("8.5", "1,5")
+_NUMBER = r"(\d{1,3}(?:[.,]\d{3})+(?![.,]?\d)|\d+(?:[.,]\d+)?)"
+_THOUSANDS = re.compile(r"\d{1,3}(?:[.,]\d{3})+")
+
+# Keyword ambang; angka yang langsung didahului keyword ini milik keyword tersebut
+# ("vote di atas 250000 rating ..." bukan rating > 250000)
+_RATING_KEYWORDS = r"(?:rating|skor|score|nilai)"
+_VOTES_KEYWORDS = r"(?:votes?|voters?|suara)"
+_OWNED_NUMBER = re.compile(rf"(?:{_RATING_KEYWORDS}|{_VOTES_KEYWORDS})\w*\s*(?:imdb\s*)?$")
+_VOTE_MULTIPLIERS = {"rb": 1_000, "ribu": 1_000, "k": 1_000, "jt": 1_000_000, "juta": 1_000_000, "m": 1_000_000}
+# Satuan opsional setelah angka ("500rb", "1,5 juta"); kata lain tidak boleh ada di antara angka dan keyword
+_UNIT = rf"\s*({'|'.join(sorted(_VOTE_MULTIPLIERS, key=len, reverse=True))})?(?!\w)"
+
+
+def _to_float(text):
+    """Konversi angka dengan koma/titik desimal ke float."""
+    return float(text.replace(",", "."))
+
+
+def _strip_separators(text):
+    return text.replace(",", "").replace(".", "")
+
+
+def _parse_years(text):
+    """Ambil rentang tahun (dict operator Range) dari teks; None jika tidak ada."""
+    # Rentang eksplisit: "2000-2010", "antara 1990 dan 2000", "dari 1995 sampai 2005"
+    match = re.search(r"(?:antara|dari)?\s*\b((?:19|20)\d{2})\s*(?:-|–|sampai|hingga|dan|s/d|to)\s*((?:19|20)\d{2})\b", text)
+    if match:
+        start, end = sorted((int(match.group(1)), int(match.group(2))))
+        return {"gte": start, "lte": end}
+
+    # Dekade: "tahun 2000-an", "1990s", "tahun 90an", "'90s", "80's"
+    # Dekade 2 digit wajib diawali "tahun" atau memakai apostrof ("umur 20an", "top 10s" bukan tahun)
+    match = (
+        re.search(r"\b((?:19|20)\d0)\s*(?:-an|an|'s|s)\b", text)
+        or re.search(r"tahun\s*'?(\d0)\s*(?:-an|an|'s|s)\b", text)
+        or re.search(r"(?<!\w)'(\d0)\s*(?:-an|an|s)\b", text)
+        or re.search(r"\b(\d0)'s\b", text)
+    )
+    if match:
+        decade = int(match.group(1))
+        if decade < 100:
+            decade += 1900 if decade >= 30 else 2000
+        return {"gte": decade, "lte": decade + 9}
+
+    # Batas satu sisi, digabung: "setelah 2010 tapi sebelum 2015" -> {"gt": 2010, "lt": 2015}
+    bounds = {}
+    one_sided = (
+        ("gt", r"(?:setelah|sesudah|after|di atas tahun|diatas tahun)"),
+        ("gte", r"(?:sejak|since|mulai)"),
+        ("lt", r"(?:sebelum|before|di bawah tahun|dibawah tahun)"),
+    )
+    for operator, words in one_sided:
+        match = re.search(rf"{words}\s*(?:tahun\s*)?((?:19|20)\d{{2}})\b", text)
+        if match:
+            bounds[operator] = int(match.group(1))
+    if bounds:
+        return bounds
+
+    # Tahun tunggal: "tahun 2019", "rilis 2008"
+    match = re.search(r"(?:tahun|rilis|year)\s*((?:19|20)\d{2})\b", text)
+    if match:
+        year = int(match.group(1))
+        return {"gte": year, "lte": year}
+
+    return None
+
+
+def _parse_threshold(text, keyword, parse_value):
+    """
+    Ambil ambang (dict operator Range) untuk keyword tertentu, mis. 'rating di atas 8.5'.
+    Pola "keyword -> angka" menang atas pola terbalik "angka -> keyword" untuk operator yang sama.
+    """
+    forward, reverse = {}, {}
+
+    for operator, words in _COMPARATORS.items():
+        for match in re.finditer(rf"{keyword}\w*\s*(?:imdb\s*)?{words}\s*{_NUMBER}{_UNIT}", text):
+            value = parse_value(match.group(1), match.group(2))
+            if value is not None:
+                forward[operator] = value
+        # Urutan terbalik: "di atas 1 juta vote", "lebih dari 500rb votes" (hanya satuan di antaranya)
+        for match in re.finditer(rf"{words}\s*{_NUMBER}{_UNIT}\s*{keyword}", text):
+            if _OWNED_NUMBER.search(text[:match.start()]):
+                continue
+            value = parse_value(match.group(1), match.group(2))
+            if value is not None:
+                reverse[operator] = value
+
+    bounds = {**reverse, **forward}
+    return bounds or None
+
+
+def _parse_rating_value(number, _unit):
+    if _THOUSANDS.fullmatch(number) and number.count(".") + number.count(",") > 1:
+        return None
+    return _to_float(number)
+
+
+def _parse_votes_value(number, unit):
+    # "1.000.000" -> 1000000; "1,5 juta" -> 1500000; "500rb" -> 500000; "250000" -> 250000
+    multiplier = _VOTE_MULTIPLIERS.get(unit, 1)
+    if multiplier == 1 or (_THOUSANDS.fullmatch(number) and number.count(".") + number.count(",") > 1):
+        return int(_strip_separators(number)) * multiplier
+    return int(_to_float(number) * multiplier)
+
+
+def parse_question_filters(question):
+    """
+    Urai constraint terstruktur dari pertanyaan natural language.
+
+    Return dict dengan key opsional:
+    - 'year': dict operator Range, mis. {"gte": 2000, "lte": 2009}
+    - 'genres': list nama genre IMDb
+    - 'rating': dict operator Range, mis. {"gt": 8.5}
+    - 'votes': dict operator Range, mis. {"gte": 1000000}
+    Dict kosong berarti tidak ada constraint yang dikenali.
+    """
+    text = question.lower()
+    constraints = {}
+
+    years = _parse_years(text)
+    if years:
+        constraints["year"] = years
+
+    genres = []
+    for keyword, genre in GENRE_KEYWORDS.items():
+        if re.search(rf"(?<![\w-]){re.escape(keyword)}(?![\w-])", text) and genre not in genres:
+            genres.append(genre)
+    if genres:
+        constraints["genres"] = genres
+
+    rating = _parse_threshold(text, _RATING_KEYWORDS, _parse_rating_value)
+    if rating:
+        constraints["rating"] = rating
+
+    votes = _parse_threshold(text, _VOTES_KEYWORDS, _parse_votes_value)
+    if votes:
+        constraints["votes"] = votes
+
+    return constraints
+
+
+def build_qdrant_filter(constraints):
+    """Bangun models.Filter dari hasil parse_question_filters; None jika tidak ada constraint."""
+    # Import lokal: qdrant_client berat dan tidak perlu di-load saat startup main.py
+    from qdrant_client import models
+
+    conditions = []
+
+    for key, field in (("year", YEAR_FIELD), ("rating", RATING_FIELD), ("votes", VOTES_FIELD)):
+        if key in constraints:
+            conditions.append(
+                models.FieldCondition(key=field, range=models.Range(**constraints[key]))
+            )
+
+    # Setiap genre wajib ada (AND), dicocokkan lewat full-text index pada string genre
+    for genre in constraints.get("genres", []):
+        conditions.append(
+            models.FieldCondition(key=GENRE_FIELD, match=models.MatchText(text=genre))
+        )
+
+    if not conditions:
+        return None
+    return models.Filter(must=conditions)
+
+
+def build_sql_where(constraints):
+    """
+    Padanan build_qdrant_filter untuk tabel movies di SQLite (jalur degraded tanpa Qdrant).
+    Return (klausa WHERE, dict parameter); klausa kosong jika tidak ada constraint.
+    """
+    conditions = []
+    params = {}
+
+    for key, column in (("year", "released_year"), ("rating", "imdb_rating"), ("votes", "no_of_votes")):
+        for operator, value in constraints.get(key, {}).items():
+            conditions.append(f"{column} {_RANGE_OPERATORS[operator]} :{key}_{operator}")
+            params[f"{key}_{operator}"] = value
+
+    for i, genre in enumerate(constraints.get("genres", [])):
+        conditions.append(f"genre LIKE :genre_{i}")
+        params[f"genre_{i}"] = f"%{genre}%"
+
+    if not conditions:
+        return "", params
+    return "WHERE " + " AND ".join(conditions), params
+
+
+def _describe_range(bounds):
+    if "gte" in bounds and "lte" in bounds and len(bounds) == 2:
+        low, high = bounds["gte"], bounds["lte"]
+        return f"{low}" if low == high else f"{low}-{high}"
+    return " & ".join(
+        f"{symbol} {bounds[operator]}" for operator, symbol in _RANGE_OPERATORS.items() if operator in bounds
+    )
+
+
+def describe_filters(constraints):
+    """Ringkasan constraint yang mudah dibaca, untuk ditampilkan di output tool."""
+    parts = []
+    if "year" in constraints:
+        parts.append(f"tahun {_describe_range(constraints['year'])}")
+    if "genres" in constraints:
+        parts.append("genre " + ", ".join(constraints["genres"]))
+    if "rating" in constraints:
+        parts.append(f"rating {_describe_range(constraints['rating'])}")
+    if "votes" in constraints:
+        parts.append(f"vote {_describe_range(constraints['votes'])}")
+    return "; ".join(parts)
@@ -0,0 +1,177 @@
+"""
+Cache thumbnail poster lokal untuk Absolute Cinema.
+
+Setiap `Poster_Link` diunduh sekali saat ingest (setup.py), diperkecil menjadi
+thumbnail, lalu disimpan dengan nama berbasis hash isi file (content-addressed)
+di folder static Streamlit. Tools kemudian mengirim URL lokal di tag `||POSTER||`
+sehingga browser tidak perlu mengambil ulang gambar dari Amazon di setiap rerun.
+
+Catatan: Streamlit melayani folder `static/` di `app/static/...` jika
+`server.enableStaticServing = true` (lihat .streamlit/config.toml).
+"""
+
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# Konstanta cache
+# - POSTER_CACHE_DIR: lokasi file thumbnail (di dalam folder static Streamlit)
+# - POSTER_URL_PREFIX: prefix URL yang dilayani Streamlit untuk folder tersebut
+# - MANIFEST_FILE: mapping URL asli -> nama file thumbnail
+POSTER_CACHE_DIR = os.path.join("static", "posters")
+POSTER_URL_PREFIX = "app/static/posters"
+MANIFEST_FILE = "manifest.json"
+
+THUMBNAIL_SIZE = (100, 150)  # (lebar, tinggi) maksimum, rasio aspek dipertahankan
+DOWNLOAD_TIMEOUT = 10  # detik
+MAX_WORKERS = 8
+
+# URL berhenti di whitespace atau penutup markdown/kalimat (")", "]", titik/koma di akhir)
+_POSTER_TAG_PATTERN = re.compile(r"(\|\|POSTER\|\|)([^\s)\]]+?)(?=[.,;:!?]*(?:[\s)\]]|$))")
+
+_manifest_lock = threading.Lock()
+_manifest_cache = {}
+
+
+def _manifest_path(cache_dir):
+    return os.path.join(cache_dir, MANIFEST_FILE)
+
+
+def load_manifest(cache_dir=POSTER_CACHE_DIR):
+    """Baca manifest (URL asli -> nama file); hasil di-cache per proses berdasarkan mtime."""
+    path = _manifest_path(cache_dir)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {}
+
+    with _manifest_lock:
+        cached = _manifest_cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        _manifest_cache[path] = (mtime, manifest)
+        return manifest
+
+
+def _write_atomic(path, data):
+    """Tulis file secara atomik (tmp file + rename) agar pembaca tidak melihat file setengah jadi."""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+
+def make_thumbnail(image_bytes, size=THUMBNAIL_SIZE):
+    """Perkecil gambar menjadi thumbnail JPEG; return bytes hasil encode."""
+    # Import lokal: Pillow hanya dibutuhkan saat ingest, bukan saat aplikasi chat berjalan
+    from PIL import Image
+
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        image = image.convert("RGB")
+        image.thumbnail(size)
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=85, optimize=True)
+        return output.getvalue()
+
+
+def fetch_poster(url, timeout=DOWNLOAD_TIMEOUT):
+    """Unduh bytes gambar poster dari URL."""
+    request = urllib.request.Request(url, headers={"User-Agent": "AbsoluteCinema/1.0"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.read()
+
+
+def cache_poster(url, cache_dir=POSTER_CACHE_DIR):
+    """
+    Unduh satu poster, simpan thumbnail-nya secara content-addressed.
+    Return nama file thumbnail (sha256 dari isi thumbnail + '.jpg').
+    """
+    thumbnail = make_thumbnail(fetch_poster(url))
+    filename = hashlib.sha256(thumbnail).hexdigest() + ".jpg"
+    path = os.path.join(cache_dir, filename)
+    # Isi identik -> nama identik, jadi file yang sudah ada tidak perlu ditulis ulang
+    if not os.path.exists(path):
+        _write_atomic(path, thumbnail)
+    return filename
+
+
+def build_poster_cache(urls, cache_dir=POSTER_CACHE_DIR, max_workers=MAX_WORKERS):
+    """
+    Unduh semua poster yang belum ada di cache (paralel) dan perbarui manifest.
+    Return tuple (jumlah baru, jumlah gagal).
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest = dict(load_manifest(cache_dir))
+
+    # Lewati URL kosong/NaN dan yang thumbnail-nya sudah tersimpan
+    pending = []
+    for url in dict.fromkeys(urls):
+        if not isinstance(url, str) or not url.startswith("http"):
+            continue
+        filename = manifest.get(url)
+        if filename and os.path.exists(os.path.join(cache_dir, filename)):
+            continue
+        pending.append(url)
+
+    def _download(url):
+        try:
+            return url, cache_poster(url, cache_dir)
+        except Exception as e:
+            print(f"Gagal mengunduh poster '{url}': {e}")
+            return url, None
+
+    added = failed = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for url, filename in executor.map(_download, pending):
+            if filename:
+                manifest[url] = filename
+                added += 1
+            else:
+                failed += 1
+
+    _write_atomic(
+        _manifest_path(cache_dir),
+        json.dumps(manifest, indent=0, sort_keys=True).encode("utf-8"),
+    )
+    return added, failed
+
+
+def local_poster_url(url, cache_dir=POSTER_CACHE_DIR, url_prefix=POSTER_URL_PREFIX):
+    """URL lokal untuk poster jika sudah di-cache; jika belum, kembalikan URL asli."""
+    filename = load_manifest(cache_dir).get(url)
+    if filename:
+        return f"{url_prefix}/{filename}"
+    return url
+
+
+def localize_poster_tags(text, cache_dir=POSTER_CACHE_DIR, url_prefix=POSTER_URL_PREFIX):
+    """Ganti setiap `||POSTER||<url>` di teks dengan URL thumbnail lokal (jika ada)."""
+    return _POSTER_TAG_PATTERN.sub(
+        lambda match: match.group(1) + local_poster_url(match.group(2), cache_dir, url_prefix),
+        text,
+    )
+
+
+if __name__ == "__main__":
+    # Jalankan manual: python poster_cache.py [path_csv]
+    import csv
+
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else "data/imdb_top_1000_cleaned.csv"
+    with open(csv_path, "r", encoding="utf-8") as csvfile:
+        poster_urls = [row["Poster_Link"] for row in csv.DictReader(csvfile)]
+    added, failed = build_poster_cache(poster_urls)
+    print(f"Poster baru di-cache: {added}, gagal: {failed}")
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Preprocessing dataset IMDb yang bisa di-import (pengganti langkah cleaning di notebook).
+
+Semua transformasi divektorisasi dengan pandas/NumPy (tanpa loop per baris),
+sehingga dump IMDb penuh pun selesai dalam hitungan detik:
+- Runtime "142 min" -> integer menit
+- Gross "28,341,469" -> float (kosong -> 0, sama seperti notebook)
+- Released_Year -> integer (nilai rusak seperti 'PG' diperbaiki lewat YEAR_OVERRIDES)
+- Certificate dinormalisasi (U/A -> UA, Approved -> Passed, Unrated/kosong -> Not Rated)
+- Genre dipecah menjadi list (Genre_List)
+- Teks untuk embedding dibangun aman terhadap NaN (pemeran/sinopsis kosong)
+
+Hasilnya ditulis sebagai artifact Parquet bertipe (data/movies.parquet) yang
+dibaca oleh setup.py, import_movies.py, dan ingest.py lewat load_movies().
+
+Jalankan manual: python preprocessing.py [input_csv] [output_parquet]
+"""
+
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+RAW_CSV_PATH = "data/imdb_top_1000_cleaned.csv"
+ARTIFACT_PATH = "data/movies.parquet"
+
+# Perbaikan manual untuk tahun rilis yang rusak di dataset sumber
+YEAR_OVERRIDES = {"Apollo 13": 1995}
+
+CERTIFICATE_MAPPING = {
+    "U/A": "UA",
+    "Approved": "Passed",
+    "Unrated": "Not Rated",
+}
+
+STRING_COLUMNS = [
+    "Poster_Link", "Series_Title", "Certificate", "Genre", "Overview",
+    "Director", "Star1", "Star2", "Star3", "Star4",
+]
+
+# Skema artifact: tipe kolom eksplisit agar semua loader membaca data yang sama
+ARTIFACT_SCHEMA = pa.schema([
+    ("Poster_Link", pa.string()),
+    ("Series_Title", pa.string()),
+    ("Released_Year", pa.int32()),
+    ("Certificate", pa.string()),
+    ("Runtime", pa.int32()),
+    ("Genre", pa.string()),
+    ("Genre_List", pa.list_(pa.string())),
+    ("IMDB_Rating", pa.float64()),
+    ("Overview", pa.string()),
+    ("Meta_score", pa.float64()),
+    ("Director", pa.string()),
+    ("Star1", pa.string()),
+    ("Star2", pa.string()),
+    ("Star3", pa.string()),
+    ("Star4", pa.string()),
+    ("No_of_Votes", pa.int64()),
+    ("Gross", pa.float64()),
+    ("text_for_embedding", pa.string()),
+])
+
+# Naikkan setiap kali logika clean_movies berubah agar artifact lama dibangun ulang
+PREPROCESSING_VERSION = 1
+FINGERPRINT_KEY = b"movies.preprocessing_fingerprint"
+
+# Mapping kolom artifact -> kolom tabel movies di SQLite (lihat import_movies.create_database)
+SQL_COLUMNS = {
+    "Poster_Link": "poster_link",
+    "Series_Title": "title",
+    "Released_Year": "released_year",
+    "Certificate": "certificate",
+    "Runtime": "runtime",
+    "Genre": "genre",
+    "IMDB_Rating": "imdb_rating",
+    "Overview": "overview",
+    "Meta_score": "meta_score",
+    "Director": "director",
+    "Star1": "star1",
+    "Star2": "star2",
+    "Star3": "star3",
+    "Star4": "star4",
+    "No_of_Votes": "no_of_votes",
+    "Gross": "gross",
+}
+
+
+def _to_number(series):
+    """Ambil angka dari teks seperti '142 min' atau '28,341,469' (vektor); gagal -> NaN."""
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype("float64")
+    cleaned = series.astype("string").str.replace(",", "", regex=False).str.extract(r"(-?\d+(?:\.\d+)?)", expand=False)
+    return pd.to_numeric(cleaned, errors="coerce")
+
+
+def clean_movies(df):
+    """Bersihkan DataFrame IMDb mentah/cleaned menjadi kolom bertipe sesuai ARTIFACT_SCHEMA."""
+    df = df.copy()
+
+    # Kolom teks: strip whitespace, string kosong -> NA
+    for column in STRING_COLUMNS:
+        values = df[column].astype("string").str.strip()
+        df[column] = values.mask(values == "")
+
+    # Tahun rilis: nilai non-angka -> NA, lalu terapkan perbaikan manual
+    year = pd.to_numeric(df["Released_Year"], errors="coerce")
+    overrides = df["Series_Title"].map(YEAR_OVERRIDES)
+    df["Released_Year"] = overrides.fillna(year).astype("Int32")
+
+    df["Runtime"] = _to_number(df["Runtime"]).round().astype("Int32")
+    df["Gross"] = _to_number(df["Gross"]).fillna(0.0)
+    df["IMDB_Rating"] = pd.to_numeric(df["IMDB_Rating"], errors="coerce").astype("float64")
+    df["Meta_score"] = pd.to_numeric(df["Meta_score"], errors="coerce").fillna(0.0)
+    df["No_of_Votes"] = _to_number(df["No_of_Votes"]).round().astype("Int64")
+
+    df["Certificate"] = df["Certificate"].replace(CERTIFICATE_MAPPING).fillna("Not Rated")
+
+    # Genre: "Crime, Drama" -> ["Crime", "Drama"]
+    df["Genre_List"] = df["Genre"].str.split(r"\s*,\s*", regex=True)
+
+    df["text_for_embedding"] = build_embedding_text(df)
+    return df[ARTIFACT_SCHEMA.names]
+
+
+def build_embedding_text(df):
+    """
+    Teks untuk embedding (judul, genre, sutradara, pemeran, sinopsis).
+    Nilai kosong tidak membuat seluruh teks menjadi NaN; pemeran kosong dilewati.
+    """
+    stars = df[["Star1", "Star2", "Star3"]].fillna("")
+    cast = stars["Star1"].str.cat([stars["Star2"], stars["Star3"]], sep=", ")
+    cast = cast.str.replace(r"(^(, )+)|((, )+$)", "", regex=True).str.replace(r"(, ){2,}", ", ", regex=True)
+
+    return (
+        "Judul: " + df["Series_Title"].fillna("") + "; "
+        + "Genre: " + df["Genre"].fillna("") + "; "
+        + "Sutradara: " + df["Director"].fillna("") + "; "
+        + "Pemeran: " + cast + "; "
+        + "Sinopsis: " + df["Overview"].fillna("")
+    ).astype("string")
+
+
+def preprocessing_fingerprint():
+    """Hash versi preprocessing + skema + tabel koreksi; berubah -> artifact dianggap basi."""
+    payload = json.dumps({
+        "version": PREPROCESSING_VERSION,
+        "schema": ARTIFACT_SCHEMA.to_string(show_schema_metadata=False),
+        "year_overrides": YEAR_OVERRIDES,
+        "certificate_mapping": CERTIFICATE_MAPPING,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def artifact_fingerprint(path):
+    """Fingerprint yang tersimpan di metadata Parquet (None jika tidak ada)."""
+    metadata = pq.read_schema(path).metadata or {}
+    value = metadata.get(FINGERPRINT_KEY)
+    return value.decode("utf-8") if value else None
+
+
+def write_artifact(df, path=ARTIFACT_PATH):
+    """Tulis DataFrame hasil clean_movies sebagai Parquet dengan ARTIFACT_SCHEMA + fingerprint."""
+    table = pa.Table.from_pandas(df, schema=ARTIFACT_SCHEMA, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[FINGERPRINT_KEY] = preprocessing_fingerprint().encode("utf-8")
+    table = table.replace_schema_metadata(metadata)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    pq.write_table(table, tmp_path, compression="zstd")
+    os.replace(tmp_path, path)
+    return path
+
+
+def build_artifact(csv_path=RAW_CSV_PATH, artifact_path=ARTIFACT_PATH):
+    """CSV -> clean_movies -> artifact Parquet. Return DataFrame hasil clean."""
+    df = clean_movies(pd.read_csv(csv_path, dtype=str, keep_default_na=True))
+    write_artifact(df, artifact_path)
+    return df
+
+
+def load_movies(path=ARTIFACT_PATH, csv_path=RAW_CSV_PATH):
+    """
+    Baca data film bertipe. `path` boleh Parquet (artifact) atau CSV (akan dibersihkan).
+    Artifact dibangun ulang jika belum ada, lebih tua dari CSV sumber, atau dibuat
+    oleh versi preprocessing/skema yang berbeda (fingerprint di metadata Parquet).
+    """
+    if not path.endswith(".parquet"):
+        return clean_movies(pd.read_csv(path, dtype=str))
+
+    stale = not os.path.exists(path) or (
+        os.path.exists(csv_path) and os.path.getmtime(csv_path) > os.path.getmtime(path)
+    ) or artifact_fingerprint(path) != preprocessing_fingerprint()
+    if stale:
+        return build_artifact(csv_path, path)
+    return pq.read_table(path).to_pandas(types_mapper={
+        pa.int32(): pd.Int32Dtype(),
+        pa.int64(): pd.Int64Dtype(),
+        pa.string(): pd.StringDtype(),
+    }.get)
+
+
+def to_sql_rows(df):
+    """Baris siap INSERT untuk tabel movies (NA -> None), urutan kolom sesuai SQL_COLUMNS."""
+    frame = df[list(SQL_COLUMNS)].astype(object)
+    frame = frame.where(frame.notna(), None)
+    return list(frame.itertuples(index=False, name=None))
+
+
+def build_documents(df):
+    """
+    Document LangChain untuk vector store: text_for_embedding + metadata payload.
+    year/rating/votes disimpan sebagai angka agar bisa difilter dengan range di Qdrant;
+    nilai kosong (NA) menjadi None agar payload tetap valid JSON.
+    """
+    from langchain_core.documents import Document
+
+    records = df[["Series_Title", "Released_Year", "IMDB_Rating", "No_of_Votes", "Genre", "Poster_Link", "text_for_embedding"]]
+    records = records.astype(object).where(records.notna(), None)
+    return [
+        Document(
+            page_content=text,
+            metadata={
+                "id": i,
+                "title": title,
+                "year": year,
+                "rating": rating,
+                "votes": votes,
+                "genre": genre,
+                "poster": poster,
+            },
+        )
+        for i, (title, year, rating, votes, genre, poster, text) in enumerate(records.itertuples(index=False, name=None))
+    ]
+
+
+if __name__ == "__main__":
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else RAW_CSV_PATH
+    artifact_path = sys.argv[2] if len(sys.argv) > 2 else ARTIFACT_PATH
+    df = build_artifact(csv_path, artifact_path)
+    print(f"Artifact '{artifact_path}' berhasil dibuat: {len(df)} film, {len(df.columns)} kolom.")
+    print(f"Tahun rilis kosong: {int(df['Released_Year'].isna().sum())}, "
+          f"rata-rata rating: {np.nanmean(df['IMDB_Rating'].to_numpy(dtype=float)):.2f}")
@@ -0,0 +1,300 @@
+"""
+Kontrol tail-latency untuk dependensi remote (OpenAI, Qdrant).
+
+- Deadline per tahap: setiap panggilan punya batas waktu sendiri (lihat konstanta *_TIMEOUT),
+  dan di dalam turn_budget() setiap tahap memakai min(deadline tahap, sisa budget giliran),
+  sehingga satu giliran chat (termasuk sub-agent SQL) tidak bisa melewati TURN_TIMEOUT.
+- Hedged request: untuk panggilan idempoten (embedding, vector search), jika
+  percobaan pertama belum selesai setelah `hedge_after` detik, kirim salinan kedua
+  dan pakai hasil yang paling cepat selesai.
+- Circuit breaker per dependensi: setelah beberapa kegagalan beruntun, breaker
+  "open" dan panggilan langsung dialihkan ke jalur degraded (index lokal / jawaban
+  cache) tanpa menunggu timeout, sampai masa reset lewat (half-open).
+  Hanya kegagalan dependensi (timeout/koneksi/5xx/429) yang dihitung; budget giliran
+  yang habis (BudgetExhausted) dan error lokal tidak membuka breaker.
+"""
+
+import contextvars
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+
+# Deadline per tahap (detik)
+EMBEDDING_TIMEOUT = 5.0
+VECTOR_SEARCH_TIMEOUT = 5.0
+LLM_TIMEOUT = 30.0
+
+# Budget total satu giliran chat (detik), dibagi oleh semua tahap di dalamnya
+TURN_TIMEOUT = 45.0
+
+# Kirim request cadangan jika request pertama belum selesai setelah ini (detik)
+HEDGE_AFTER = 1.0
+
+# Circuit breaker: jumlah kegagalan beruntun sebelum open, dan lama open sebelum dicoba lagi
+FAILURE_THRESHOLD = 3
+RESET_TIMEOUT = 30.0
+
+# Worker untuk panggilan hedged (dibagi semua sesi dalam satu proses)
+HEDGE_WORKERS = 16
+
+_executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="hedged-call")
+
+# Jumlah percobaan hedged yang sudah di-submit tetapi belum mendapat worker
+_queued_calls = 0
+_queued_lock = threading.Lock()
+
+
+class DeadlineExceeded(TimeoutError):
+    """Panggilan tidak selesai dalam deadline tahapnya."""
+
+
+class BudgetExhausted(DeadlineExceeded):
+    """Budget waktu giliran habis; bukan kegagalan dependensi remote."""
+
+
+class CircuitOpenError(RuntimeError):
+    """Breaker dependensi sedang open; panggilan tidak dijalankan."""
+
+
+# Deadline absolut (time.monotonic) giliran yang sedang berjalan; ikut tersalin ke thread
+# tool LangChain/LangGraph karena mereka menjalankan tool dengan contextvars.copy_context()
+_turn_deadline = contextvars.ContextVar("turn_deadline", default=None)
+
+
+@contextmanager
+def turn_budget(timeout=TURN_TIMEOUT):
+    """Pasang budget waktu untuk satu giliran; budget bersarang tidak bisa memperpanjang yang luar."""
+    deadline = time.monotonic() + timeout
+    outer = _turn_deadline.get()
+    if outer is not None:
+        deadline = min(deadline, outer)
+    token = _turn_deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _turn_deadline.reset(token)
+
+
+def remaining_budget():
+    """Sisa budget giliran (detik), atau None jika tidak sedang di dalam turn_budget()."""
+    deadline = _turn_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def check_budget():
+    """Raise BudgetExhausted jika budget giliran sudah habis (dipanggil di antara langkah agent)."""
+    remaining = remaining_budget()
+    if remaining is not None and remaining <= 0:
+        raise BudgetExhausted("budget waktu giliran sudah habis")
+    return remaining
+
+
+def stage_timeout(timeout):
+    """Deadline satu tahap: min(`timeout`, sisa budget giliran). BudgetExhausted jika budget habis."""
+    remaining = check_budget()
+    return timeout if remaining is None else min(timeout, remaining)
+
+
+def _adjust_queued(delta):
+    global _queued_calls
+    with _queued_lock:
+        _queued_calls += delta
+
+
+def _submit(fn, *args, **kwargs):
+    """Submit ke executor hedged dengan context pemanggil (budget giliran, dll.) dan penghitung antrean."""
+    def run():
+        _adjust_queued(-1)
+        return fn(*args, **kwargs)
+
+    _adjust_queued(1)
+    future = _executor.submit(contextvars.copy_context().run, run)
+    # Future yang dibatalkan sebelum mendapat worker tidak pernah menjalankan run()
+    future.add_done_callback(lambda f: f.cancelled() and _adjust_queued(-1))
+    return future
+
+
+def hedged_call(fn, *args, timeout, hedge_after=HEDGE_AFTER, max_attempts=2, **kwargs):
+    """
+    Jalankan `fn` dengan deadline total `timeout` (dipotong ke sisa budget giliran).
+    Jika belum selesai setelah `hedge_after` detik, kirim percobaan tambahan (maks
+    `max_attempts` total) dan kembalikan hasil sukses pertama. Hanya untuk panggilan idempoten.
+    Percobaan yang kalah/ditinggal dan belum mulai dibatalkan agar tidak memakai worker;
+    yang sudah berjalan dibatasi oleh timeout client-nya sendiri.
+    Jika deadline yang terlewat adalah sisa budget giliran (bukan deadline tahap), yang
+    di-raise BudgetExhausted agar tidak dihitung sebagai kegagalan dependensi.
+    """
+    stage_limit = timeout
+    timeout = stage_timeout(timeout)
+    deadline = time.monotonic() + timeout
+    pending = {_submit(fn, *args, **kwargs)}
+    attempts = 1
+    last_error = None
+
+    try:
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # Tunggu sampai waktu hedge berikutnya (jika masih boleh hedge) atau sampai deadline
+            wait_for = min(hedge_after, remaining) if attempts < max_attempts else remaining
+            done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    return future.result()
+                last_error = error
+
+            if attempts < max_attempts and time.monotonic() < deadline:
+                # Hedge karena lambat, atau retry karena percobaan sebelumnya gagal
+                pending.add(_submit(fn, *args, **kwargs))
+                attempts += 1
+    finally:
+        for future in pending:
+            future.cancel()
+
+    if last_error is not None and not pending:
+        raise last_error
+    error_type = BudgetExhausted if timeout < stage_limit else DeadlineExceeded
+    raise error_type(f"{getattr(fn, '__name__', 'call')} melewati deadline {timeout:.1f}s")
+
+
+def pending_hedged_calls():
+    """Jumlah panggilan hedged yang sedang antre menunggu worker executor (dari penghitung antrean)."""
+    with _queued_lock:
+        return _queued_calls
+
+
+# Nama kelas error transport dari client remote (openai, httpx, qdrant-client), dicek lewat
+# MRO agar resilience tidak perlu meng-import library tersebut
+TRANSPORT_ERROR_NAMES = {"APIConnectionError", "TransportError", "ResponseHandlingException"}
+
+
+def is_dependency_failure(error):
+    """
+    True jika `error` menandakan dependensi remote tidak sehat: deadline tahap, timeout/koneksi,
+    status 5xx atau 429. Budget giliran yang habis dan error lokal (bug, query ditolak) tidak dihitung.
+    """
+    if isinstance(error, BudgetExhausted):
+        return False
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if isinstance(status, int):
+        return status >= 500 or status == 429
+    if isinstance(error, (DeadlineExceeded, TimeoutError, ConnectionError, OSError)):
+        return True
+    return any(cls.__name__ in TRANSPORT_ERROR_NAMES for cls in type(error).__mro__)
+
+
+class CircuitBreaker:
+    """Circuit breaker sederhana: closed -> open (setelah N gagal) -> half-open -> closed."""
+
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._half_open_trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def allow(self):
+        """True jika panggilan boleh dijalankan (closed, atau satu percobaan saat half-open)."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._half_open_trial:
+                return False
+            self._half_open_trial = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._half_open_trial = False
+
+    def release(self):
+        """Panggilan selesai tanpa hasil yang menilai dependensi; lepaskan slot percobaan half-open."""
+        with self._lock:
+            self._half_open_trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._half_open_trial = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    print(f"Peringatan: circuit breaker '{self.name}' terbuka, memakai jalur degraded.")
+                self._opened_at = time.monotonic()
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Jalankan `fn` lewat breaker; raise CircuitOpenError jika breaker open.
+        Hanya error yang lolos is_dependency_failure() yang dihitung sebagai kegagalan.
+        """
+        if not self.allow():
+            raise CircuitOpenError(f"Dependensi '{self.name}' sedang tidak sehat (circuit open).")
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as error:
+            if is_dependency_failure(error):
+                self.record_failure()
+            else:
+                self.release()
+            raise
+        self.record_success()
+        return result
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name):
+    """Satu circuit breaker per dependensi per proses."""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name)
+        return breaker
+
+
+class AnswerCache:
+    """LRU kecil untuk jawaban sukses terakhir; dipakai sebagai jalur degraded."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(question):
+        return " ".join(question.lower().split())
+
+    def get(self, question):
+        key = self._key(question)
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, question, answer):
+        key = self._key(question)
+        with self._lock:
+            self._entries[key] = answer
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
@@ -3,13 +3,14 @@
 # - Library untuk file I/O, data processing, SQL, embeddings, Qdrant, dan dotenv.
 # - Jangan ubah import: mereka diperlukan untuk proses setup.
 import os
-import pandas as pd
-from sqlalchemy import create_engine
 from langchain_openai import OpenAIEmbeddings
 from langchain_qdrant import QdrantVectorStore
-from langchain_core.documents import Document
-from qdrant_client import QdrantClient
+from qdrant_client import QdrantClient, models
 from dotenv import load_dotenv
+from movie_filters import YEAR_FIELD, RATING_FIELD, VOTES_FIELD, GENRE_FIELD
+from poster_cache import build_poster_cache, POSTER_CACHE_DIR
+from preprocessing import RAW_CSV_PATH, ARTIFACT_PATH, load_movies, build_documents
+from import_movies import import_dataframe_to_db
 
 # Load environment variables
 # - Prioritas: file .env lokal. Variabel penting:
@@ -24,21 +25,24 @@ QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
 
 # BAGIAN 2: PATHS & KONSTANTA
 # 2.1: File / resource paths
-# - csv_path: sumber data IMDb yang sudah dibersihkan
-# - db_path: SQLite URI yang akan menghasilkan file movies.db
+# - csv_path: sumber data IMDb mentah/cleaned
+# - artifact_path: artifact Parquet bertipe hasil preprocessing.py
+# - db_path: file SQLite untuk tool SQL
 # - qdrant_collection_name: nama koleksi tempat vector akan disimpan
-csv_path = 'data/imdb_top_1000_cleaned.csv'
-db_path = 'sqlite:///movies.db' # Ini akan membuat file 'movies.db'
+csv_path = RAW_CSV_PATH
+artifact_path = ARTIFACT_PATH
+db_path = 'movies.db'
 qdrant_collection_name = 'fadhlanrio'
 
-# BAGIAN 3: LOAD DATA CSV
+# BAGIAN 3: LOAD DATA (ARTIFACT PREPROCESSING)
 # Tujuan
-# - Memuat CSV sebagai DataFrame pandas untuk diproses lebih lanjut.
+# - Memuat data film bertipe dari artifact Parquet (preprocessing.py).
+# - Artifact dibangun ulang otomatis dari CSV jika belum ada atau CSV lebih baru.
 # Error handling
 # - Jika file tidak ditemukan, hentikan proses dengan pesan yang jelas.
 try:
-    df = pd.read_csv(csv_path)
-    print(f"Data CSV '{csv_path}' berhasil dimuat.")
+    df = load_movies(artifact_path, csv_path)
+    print(f"Data film dari '{artifact_path}' berhasil dimuat ({len(df)} film).")
 except FileNotFoundError:
     print(f"ERROR: File CSV tidak ditemukan di '{csv_path}'.")
     exit()
@@ -47,23 +51,30 @@ except FileNotFoundError:
 # Tujuan
 # - Menyimpan DataFrame ke SQLite agar tool SQL dapat dijalankan terhadap tabel 'movies'.
 # Pendekatan
-# - Gunakan create_engine dari SQLAlchemy dan df.to_sql(if_exists='replace').
+# - Gunakan import_movies.import_dataframe_to_db: skema kolom snake_case yang sama
+#   dengan yang dijelaskan di prompt tool SQL (title, released_year, imdb_rating, ...).
 # Catatan
-# - if_exists='replace' menimpa tabel lama; ini berguna untuk development/refresh data.
+# - Data lama di tabel dihapus; versi database dinaikkan agar cache hasil query
+#   SQL (sql_cache.py) otomatis invalid.
 print("\nMemulai setup database SQL...")
 try:
-    # Buat koneksi engine ke file database SQLite
-    engine = create_engine(db_path)
-    
-    # Simpan DataFrame ke database SQL sebagai tabel bernama 'movies'
-    # if_exists='replace' berarti akan menimpa tabel jika sudah ada
-    df.to_sql('movies', engine, if_exists='replace', index=False)
-    
-    print(f"Database SQL 'movies.db' dan tabel 'movies' berhasil dibuat.")
+    imported_count = import_dataframe_to_db(df, db_path)
+    print(f"Database SQL '{db_path}' dan tabel 'movies' berhasil dibuat ({imported_count} film).")
 except Exception as e:
     print(f"ERROR saat membuat database SQL: {e}")
     exit()
 
+# BAGIAN 4B: CACHE POSTER LOKAL
+# Tujuan
+# - Unduh setiap Poster_Link sekali, simpan thumbnail content-addressed di static/posters.
+# - Tools akan mengirim URL lokal ini sehingga chat tidak bergantung ke Amazon saat render.
+# Catatan
+# - Poster yang sudah ada di cache dilewati; kegagalan unduh tidak menghentikan setup
+#   (tools otomatis memakai URL asli untuk poster yang tidak ter-cache).
+print("\nMemulai cache poster lokal...")
+added, failed = build_poster_cache(df['Poster_Link'].tolist())
+print(f"Cache poster di '{POSTER_CACHE_DIR}': {added} baru, {failed} gagal.")
+
 # BAGIAN 5: SETUP VECTOR DATABASE (QDRANT)
 # Tujuan utama
 # - Membuat koleksi vector di Qdrant berisi embedded documents dari dataset.
@@ -83,32 +94,13 @@ try:
         api_key=OPENAI_API_KEY
     )
 
-    # Siapkan teks untuk embedding
-    # - Gabungkan field penting (judul, genre, director, cast, overview)
-    # - Tujuan: memberikan konteks yang kaya untuk similarity search
-    df['text_for_embedding'] = (
-        "Judul: " + df['Series_Title'] + "; " +
-        "Genre: " + df['Genre'] + "; " +
-        "Sutradara: " + df['Director'] + "; " +
-        "Pemeran: " + df['Star1'] + ", " + df['Star2'] + ", " + df['Star3'] + "; " +
-        "Sinopsis: " + df['Overview']
-    )
+    # Teks untuk embedding sudah disiapkan di artifact (kolom text_for_embedding)
+    # - Gabungan judul, genre, director, cast, overview; aman terhadap nilai kosong
 
-    # Konversi ke Document (LangChain)
-    # - Sertakan metadata yang berguna (title, year, rating, genre, poster)
-    documents = [
-        Document(
-            page_content=row['text_for_embedding'],
-            metadata={
-                'id': i,
-                'title': row['Series_Title'],
-                'year': row['Released_Year'],
-                'rating': row['IMDB_Rating'],
-                'genre': row['Genre'],
-                'poster': row['Poster_Link']
-            }
-        ) for i, row in df.iterrows()
-    ]
+    # Konversi ke Document (LangChain) lewat preprocessing.build_documents
+    # - Sertakan metadata yang berguna (title, year, rating, votes, genre, poster)
+    # - year/rating/votes disimpan sebagai angka agar bisa difilter dengan range di Qdrant
+    documents = build_documents(df)
 
     # Inisialisasi Qdrant client & VectorStore
     # - Tambahkan timeout lebih besar untuk mengurangi kemungkinan kegagalan saat upload
@@ -134,6 +126,28 @@ try:
     )
     print(f"Koleksi '{qdrant_collection_name}' telah dikosongkan dan siap diisi ulang.")
 
+    # Buat payload index untuk filter terstruktur (lihat movie_filters.py)
+    # - year/votes: INTEGER, rating: FLOAT -> filter range (tahun 2000-an, rating di atas 8.5)
+    # - genre: TEXT (full-text) -> cocokkan satu genre di string "Crime, Drama"
+    # - Index membuat Qdrant memangkas kandidat sebelum scoring, bukan memfilter setelahnya
+    payload_indexes = {
+        YEAR_FIELD: models.PayloadSchemaType.INTEGER,
+        RATING_FIELD: models.PayloadSchemaType.FLOAT,
+        VOTES_FIELD: models.PayloadSchemaType.INTEGER,
+        GENRE_FIELD: models.TextIndexParams(
+            type=models.TextIndexType.TEXT,
+            tokenizer=models.TokenizerType.WORD,
+            lowercase=True,
+        ),
+    }
+    for field_name, field_schema in payload_indexes.items():
+        client.create_payload_index(
+            collection_name=qdrant_collection_name,
+            field_name=field_name,
+            field_schema=field_schema,
+        )
+    print(f"Payload index dibuat untuk: {', '.join(payload_indexes)}")
+
     # Upload document secara batching
     # - Alasan batching: mengurangi timeout, memori, dan beban jaringan
     # - Pilih batch_size sesuai kualitas koneksi dan quota API
@@ -0,0 +1,196 @@
+"""
+Cache hasil query SQL untuk tool get_factual_movie_data.
+
+Sub-agent SQL sering menghasilkan query yang sama atau setara untuk pertanyaan
+berbeda ("top 5 gross", "film terlaris"). Hasil query di-cache dengan key:
+- SQL yang dinormalisasi (spasi, huruf besar/kecil di luar literal, urutan literal di IN (...))
+- version stamp movies.db (mtime/ukuran file + PRAGMA user_version)
+
+import_movies.import_dataframe_to_db (dipakai juga oleh setup.py) memanggil
+bump_db_version setiap kali menulis ulang tabel movies, sehingga cache lama
+otomatis tidak terpakai.
+Hasil disimpan terkompresi dan total ukurannya dibatasi dengan eviction LRU.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+
+from langchain_community.utilities.sql_database import SQLDatabase
+
+MAX_CACHE_BYTES = 8 * 1024 * 1024  # batas memori cache per database (8 MB)
+COMPRESS_THRESHOLD = 512  # hasil lebih kecil dari ini tidak dikompres
+
+# Token SQL: literal string ('...'), identifier ber-quote ("..."), spasi, atau sisanya
+_SQL_TOKEN = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|\s+|[^\s'\"]+")
+_PUNCT_SPACING = re.compile(r"\s*([,()=<>!+*/])\s*")
+_LITERAL = r"(?:'(?:[^']|'')*'|-?\d+(?:\.\d+)?)"
+_IN_LIST = re.compile(rf"\bin\(({_LITERAL}(?:,{_LITERAL})*)\)")
+_CACHEABLE = re.compile(r"^(?:select|with)\b")
+
+
+def normalize_sql(sql):
+    """
+    Normalisasi SQL untuk key cache:
+    - kompres whitespace dan rapikan spasi di sekitar tanda baca
+    - lowercase di luar literal string (literal tetap case-sensitive)
+    - urutkan literal di dalam IN (...) dan buang titik koma di akhir
+    """
+    parts = []
+    for token in _SQL_TOKEN.findall(sql.strip().rstrip(";").strip()):
+        if token.startswith("'"):
+            parts.append(token)
+        elif token.isspace():
+            parts.append(" ")
+        else:
+            parts.append(token.lower())
+
+    # Rapikan spasi di sekitar tanda baca, di luar literal
+    segments = re.split(r"('(?:[^']|'')*')", "".join(parts))
+    text = "".join(
+        segment if segment.startswith("'") else _PUNCT_SPACING.sub(r"\1", segment)
+        for segment in segments
+    )
+
+    def _sort_in_list(match):
+        literals = re.findall(_LITERAL, match.group(1))
+        return "in(" + ",".join(sorted(set(literals))) + ")"
+
+    return _IN_LIST.sub(_sort_in_list, text)
+
+
+def db_version(db_path):
+    """Stat file database: (mtime_ns, ukuran) untuk file utama dan WAL-nya."""
+    stamp = []
+    for path in (db_path, db_path + "-wal"):
+        try:
+            stat = os.stat(path)
+            stamp.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+def bump_db_version(db_path):
+    """Naikkan PRAGMA user_version; dipanggil setelah tabel movies ditulis ulang."""
+    conn = sqlite3.connect(db_path)
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        conn.execute(f"PRAGMA user_version = {int(version) + 1}")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+class SQLResultCache:
+    """Cache LRU hasil query (dalam bentuk string hasil SQLDatabase.run) dengan batas byte."""
+
+    def __init__(self, db_path, max_bytes=MAX_CACHE_BYTES):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._stat = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def version(self):
+        """Version stamp saat ini; user_version hanya dibaca ulang jika stat file berubah."""
+        stat = db_version(self.db_path)
+        with self._lock:
+            if stat == self._stat:
+                return self._version
+        try:
+            conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+            try:
+                user_version = conn.execute("PRAGMA user_version").fetchone()[0]
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            user_version = None
+        with self._lock:
+            if stat != self._stat:
+                # Database berubah: semua entry lama tidak valid lagi
+                self._entries.clear()
+                self._size = 0
+                self._stat = stat
+                self._version = (user_version, stat)
+            return self._version
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        compressed, data = entry
+        return (zlib.decompress(data) if compressed else data).decode("utf-8")
+
+    def put(self, key, value):
+        data = value.encode("utf-8")
+        compressed = len(data) >= COMPRESS_THRESHOLD
+        if compressed:
+            data = zlib.compress(data)
+        size = len(data)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old[1])
+            self._entries[key] = (compressed, data)
+            self._size += size
+            while self._size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_result_cache(db_path):
+    """Satu SQLResultCache per file database per proses."""
+    db_path = os.path.abspath(db_path)
+    with _caches_lock:
+        cache = _caches.get(db_path)
+        if cache is None:
+            cache = _caches[db_path] = SQLResultCache(db_path)
+        return cache
+
+
+class CachedSQLDatabase(SQLDatabase):
+    """SQLDatabase yang melayani query read-only berulang dari SQLResultCache."""
+
+    @property
+    def result_cache(self):
+        return get_result_cache(self._engine.url.database)
+
+    def run(self, command, fetch="all", include_columns=False, *, parameters=None, execution_options=None):
+        if not isinstance(command, str) or fetch == "cursor" or execution_options:
+            return super().run(command, fetch, include_columns, parameters=parameters, execution_options=execution_options)
+
+        normalized = normalize_sql(command)
+        if not _CACHEABLE.match(normalized):
+            return super().run(command, fetch, include_columns, parameters=parameters, execution_options=execution_options)
+
+        cache = self.result_cache
+        key = (cache.version(), normalized, fetch, include_columns, repr(sorted((parameters or {}).items())))
+        result = cache.get(key)
+        if result is None:
+            result = super().run(command, fetch, include_columns, parameters=parameters)
+            if isinstance(result, str):
+                cache.put(key, result)
+        return result
@@ -0,0 +1,133 @@
+"""
+Lapisan koneksi SQLite read-only + guard biaya untuk SQL buatan LLM.
+
+Sub-agent SQL bisa menghasilkan query yang sangat mahal (cross join, SELECT
+tanpa batas, scan LIKE '%x%'). Engine dari modul ini:
+- memakai pool koneksi read-only (`mode=ro` + `PRAGMA query_only`) yang dipakai ulang antar panggilan tool
+- memeriksa setiap SELECT dengan EXPLAIN QUERY PLAN dan menolak plan cartesian (full scan bersarang)
+- membungkus SELECT dengan LIMIT keras (MAX_ROWS)
+- menghentikan query yang melebihi QUERY_TIMEOUT (atau sisa budget giliran, lihat
+  resilience.turn_budget) lewat progress handler SQLite
+
+Error guard berupa SQLAlchemyError, sehingga tool SQL (run_no_throw) mengembalikannya
+ke sub-agent sebagai pesan error dan agent bisa menulis ulang query-nya.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.pool import QueuePool
+
+from resilience import stage_timeout
+
+POOL_SIZE = 4  # koneksi read-only yang disimpan di pool
+POOL_TIMEOUT = 10  # detik menunggu koneksi bebas sebelum gagal
+QUERY_TIMEOUT = 5.0  # detik maksimum eksekusi (termasuk fetch) per query
+MAX_ROWS = 200  # batas keras jumlah baris hasil per query
+PROGRESS_STEPS = 1000  # instruksi VM SQLite antar pengecekan deadline
+
+_GUARDED_STATEMENT = re.compile(r"^\s*(?:select|with)\b", re.IGNORECASE)
+_FULL_SCAN = re.compile(r"^SCAN (?!CONSTANT ROW)")
+
+
+class QueryRejectedError(SQLAlchemyError):
+    """Query ditolak guard sebelum dieksekusi (mis. plan cartesian)."""
+
+
+def find_cartesian_scans(plan_rows):
+    """
+    Cari full scan bersarang di hasil EXPLAIN QUERY PLAN (id, parent, notused, detail).
+    Return list detail scan yang bermasalah; kosong berarti plan aman.
+    - Dua atau lebih SCAN di level yang sama = nested loop tanpa index (cartesian).
+    - SCAN di dalam subquery berkorelasi, sementara query luar juga SCAN = kuadratik.
+    """
+    nodes = {row[0]: (row[1], row[3]) for row in plan_rows}
+    scans_by_parent = {}
+    for node_id, (parent, detail) in nodes.items():
+        if _FULL_SCAN.match(detail):
+            scans_by_parent.setdefault(parent, []).append(detail)
+
+    for details in scans_by_parent.values():
+        if len(details) >= 2:
+            return details
+
+    outer_scans = scans_by_parent.get(0, [])
+    if outer_scans:
+        for parent, details in scans_by_parent.items():
+            ancestor = parent
+            while ancestor in nodes:
+                if nodes[ancestor][1].startswith("CORRELATED"):
+                    return outer_scans + details
+                ancestor = nodes[ancestor][0]
+    return []
+
+
+def _limit_rows(statement, max_rows):
+    """Bungkus SELECT dengan LIMIT keras tanpa mengubah urutan hasil."""
+    statement = statement.strip().rstrip(";")
+    # Newline sebelum ')' agar komentar `--` di akhir query tidak ikut menelan kurung tutup
+    return f"SELECT * FROM ({statement}\n) LIMIT {max_rows}"
+
+
+def _connect_readonly(db_path):
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+    conn.execute("PRAGMA query_only = ON")
+    return conn
+
+
+def create_readonly_engine(db_path, pool_size=POOL_SIZE, query_timeout=QUERY_TIMEOUT, max_rows=MAX_ROWS):
+    """Engine SQLAlchemy berisi pool koneksi read-only dengan guard biaya query."""
+    db_path = os.path.abspath(db_path)
+    # URL tetap menunjuk ke file (dipakai sql_cache untuk version stamp); koneksi dibuat oleh creator
+    engine = create_engine(
+        f"sqlite:///{db_path}",
+        creator=lambda: _connect_readonly(db_path),
+        poolclass=QueuePool,
+        pool_size=pool_size,
+        max_overflow=0,
+        pool_timeout=POOL_TIMEOUT,
+    )
+
+    @event.listens_for(engine, "before_cursor_execute", retval=True)
+    def _guard_query(conn, cursor, statement, parameters, context, executemany):
+        if not _GUARDED_STATEMENT.match(statement):
+            return statement, parameters
+
+        dbapi_conn = cursor.connection
+        plan = dbapi_conn.execute(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+        cartesian = find_cartesian_scans(plan)
+        if cartesian:
+            raise QueryRejectedError(
+                "Query ditolak: plan melakukan full scan bersarang (cartesian join) "
+                f"[{'; '.join(cartesian)}]. Tambahkan kondisi JOIN/WHERE yang menghubungkan tabel."
+            )
+
+        # Time budget: progress handler menghentikan query (juga saat fetch) setelah deadline
+        deadline = time.monotonic() + stage_timeout(query_timeout)
+        dbapi_conn.set_progress_handler(lambda: int(time.monotonic() > deadline), PROGRESS_STEPS)
+        return _limit_rows(statement, max_rows), parameters
+
+    @event.listens_for(engine, "checkin")
+    def _reset_progress_handler(dbapi_conn, connection_record):
+        dbapi_conn.set_progress_handler(None, 0)
+
+    return engine
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_readonly_engine(db_path):
+    """Satu engine (dan pool) read-only per file database per proses."""
+    db_path = os.path.abspath(db_path)
+    with _engines_lock:
+        engine = _engines.get(db_path)
+        if engine is None:
+            engine = _engines[db_path] = create_readonly_engine(db_path)
+        return engine
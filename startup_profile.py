@@ -0,0 +1,181 @@
+"""
+Profiling cold-start dan inisialisasi lazy untuk main.py.
+
+- `lazy_resource(name)`: dekorator untuk komponen berat (LLM client, agent, Qdrant,
+  Langfuse). Komponen dibuat sekali per proses saat pertama dipakai (atau saat
+  warm-up), thread-safe, dan waktu pembuatannya dicatat.
+- `warm_in_background(...)`: bangun komponen berat di thread latar belakang setelah
+  UI pertama tampil, sehingga first paint tidak menunggu import/inisialisasi.
+- Mode profiling (env STARTUP_PROFILE=1): waktu tiap tahap dicetak ke konsol dan
+  ditampilkan di sidebar.
+
+Jalankan `python startup_profile.py` untuk mengukur waktu import top-level main.py
+di proses baru (cold) dan waktu import tiap dependensi berat, lalu membandingkannya
+dengan COLD_START_BUDGET. Exit code 1 jika budget terlampaui.
+"""
+
+import ast
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+PROFILE_ENABLED = os.getenv("STARTUP_PROFILE") == "1"
+
+# Budget cold-start (detik): import top-level main.py sampai UI pertama siap dirender
+COLD_START_BUDGET = float(os.getenv("COLD_START_BUDGET", "2.0"))
+
+# Dependensi berat yang sengaja di-load secara lazy oleh main.py
+HEAVY_DEPENDENCIES = [
+    "langchain_openai",
+    "langchain_qdrant",
+    "qdrant_client",
+    "langchain_community.agent_toolkits.sql.toolkit",
+    "langchain.agents",
+    "langfuse",
+    "sqlalchemy",
+    "PIL.Image",
+]
+
+_timings = OrderedDict()
+_timings_lock = threading.Lock()
+_resources = {}
+_resource_locks = {}
+_registry_lock = threading.Lock()
+_warmup_started = False
+
+
+def record_timing(stage, seconds):
+    """Catat durasi satu tahap (hanya entri pertama per tahap yang disimpan)."""
+    with _timings_lock:
+        _timings.setdefault(stage, seconds)
+    if PROFILE_ENABLED:
+        print(f"[startup] {stage}: {seconds * 1000:.1f} ms")
+
+
+def get_timings():
+    with _timings_lock:
+        return OrderedDict(_timings)
+
+
+@contextmanager
+def profile_stage(stage):
+    """Ukur durasi satu tahap: `with profile_stage("ui"): ...`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(stage, time.perf_counter() - start)
+
+
+def lazy_resource(name):
+    """
+    Dekorator: fungsi factory hanya dijalankan sekali per proses (keyed by `name`,
+    sehingga tetap berlaku walau Streamlit mengeksekusi ulang script di setiap rerun).
+    """
+    def decorator(factory):
+        def get():
+            if name in _resources:
+                return _resources[name]
+            with _registry_lock:
+                lock = _resource_locks.setdefault(name, threading.Lock())
+            with lock:
+                if name not in _resources:
+                    with profile_stage(f"init {name}"):
+                        _resources[name] = factory()
+            return _resources[name]
+
+        get.__name__ = factory.__name__
+        get.__doc__ = factory.__doc__
+        return get
+    return decorator
+
+
+def set_resource(name, value):
+    """Pasang komponen secara langsung (mis. model palsu di loadtest.py); factory-nya tidak dijalankan."""
+    with _registry_lock:
+        _resources[name] = value
+
+
+def warm_in_background(*getters):
+    """Panggil getter lazy_resource di thread daemon (sekali per proses)."""
+    global _warmup_started
+    with _registry_lock:
+        if _warmup_started:
+            return
+        _warmup_started = True
+
+    def _warm():
+        with profile_stage("background warm-up"):
+            for getter in getters:
+                try:
+                    getter()
+                except Exception as e:
+                    print(f"Peringatan: warm-up '{getter.__name__}' gagal, akan dicoba lagi saat dipakai. Error: {e}")
+
+    threading.Thread(target=_warm, name="startup-warmup", daemon=True).start()
+
+
+def top_level_imports(path):
+    """Daftar modul yang di-import di level modul (bukan di dalam fungsi) pada file Python."""
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def measure_cold_import(modules):
+    """Waktu import `modules` di interpreter baru (cold); None jika gagal di-import."""
+    code = (
+        "import time\n"
+        "start = time.perf_counter()\n"
+        + "".join(f"import {module}\n" for module in modules)
+        + "print(time.perf_counter() - start)\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if result.returncode != 0:
+        return None
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    main_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    eager_modules = top_level_imports(main_path)
+
+    print(f"{'='*50}")
+    print("Waktu import per dependensi (proses baru):")
+    print(f"{'='*50}")
+    for module in eager_modules + [m for m in HEAVY_DEPENDENCIES if m not in eager_modules]:
+        seconds = measure_cold_import([module])
+        label = "eager" if module in eager_modules else "lazy"
+        timing = "tidak terpasang" if seconds is None else f"{seconds * 1000:8.1f} ms"
+        print(f"{module:<50} {label:<6} {timing}")
+
+    total = measure_cold_import(eager_modules)
+    print(f"\n{'='*50}")
+    if total is None:
+        print("Gagal meng-import dependensi top-level main.py.")
+        return 1
+    print(f"Total import top-level main.py: {total * 1000:.1f} ms (budget {COLD_START_BUDGET * 1000:.0f} ms)")
+    if total > COLD_START_BUDGET:
+        print("Cold-start MELEBIHI budget!")
+        return 1
+    print("Cold-start dalam budget.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+import sqlite3
+import time
+
+import pytest
+
+from conversation_store import ConversationStore, is_valid_session_id, new_session_id
+
+
+@pytest.fixture
+def make_store(tmp_path):
+    stores = []
+
+    def factory(**kwargs):
+        kwargs.setdefault("flush_interval", 60)  # flush manual agar test deterministik
+        store = ConversationStore(str(tmp_path / "conversations.db"), **kwargs)
+        stores.append(store)
+        return store
+
+    yield factory
+    for store in stores:
+        store.close()
+
+
+def _db_rows(store, session_id=None):
+    conn = sqlite3.connect(store.db_path)
+    try:
+        if session_id is None:
+            return conn.execute("SELECT session_id, role, content FROM messages ORDER BY id").fetchall()
+        return conn.execute(
+            "SELECT role, content FROM messages WHERE session_id = ? ORDER BY id", (session_id,)
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def test_write_behind_preserves_order(make_store):
+    store = make_store()
+    store.append("a", "user", "a1")
+    store.append("b", "user", "b1")
+    store.append("a", "assistant", "a2")
+
+    # Belum ditulis sampai flush, tetapi sudah terbaca dari memori
+    assert _db_rows(store) == []
+    assert [m["content"] for m in store.get_messages("a")] == ["a1", "a2"]
+
+    store.flush()
+    assert _db_rows(store) == [("a", "user", "a1"), ("b", "user", "b1"), ("a", "assistant", "a2")]
+
+
+def test_batch_size_triggers_background_flush(make_store):
+    store = make_store(flush_batch_size=3)
+    for i in range(3):
+        store.append("s", "user", f"m{i}")
+
+    deadline = time.monotonic() + 2
+    while not _db_rows(store, "s") and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [content for _, content in _db_rows(store, "s")] == ["m0", "m1", "m2"]
+
+
+def test_lru_eviction_rehydrates_from_sqlite(make_store):
+    store = make_store(max_sessions=2, hot_window=3)
+    for i in range(5):
+        store.append("old", "user", f"old{i}")
+    store.append("mid", "user", "mid0")
+    store.append("new", "user", "new0")
+
+    # "old" adalah sesi yang paling lama tidak diakses -> dikeluarkan dari memori
+    assert list(store._sessions) == ["mid", "new"]
+
+    assert store.count("old") == 5
+    assert [m["content"] for m in store.get_messages("old")] == ["old2", "old3", "old4"]
+    assert [m["content"] for m in store.get_history("old")] == [f"old{i}" for i in range(5)]
+    assert [m["content"] for m in store.get_history("old", limit=4)] == ["old1", "old2", "old3", "old4"]
+    assert list(store._sessions) == ["new", "old"]
+
+
+def test_history_survives_restart(make_store):
+    store = make_store()
+    store.append("s", "user", "halo")
+    store.append("s", "assistant", "hai")
+    store.close()
+
+    reopened = make_store()
+    assert reopened.count("s") == 2
+    assert [m["content"] for m in reopened.get_messages("s")] == ["halo", "hai"]
+
+
+def test_clear_removes_memory_queue_and_db(make_store):
+    store = make_store()
+    store.append("s", "user", "tersimpan")
+    store.flush()
+    store.append("s", "user", "masih di antrean")
+    store.append("other", "user", "tetap ada")
+
+    store.clear("s")
+    store.flush()
+
+    assert store.count("s") == 0
+    assert store.get_history("s") == []
+    assert _db_rows(store, "s") == []
+    assert _db_rows(store, "other") == [("user", "tetap ada")]
+
+
+class _FailingWrites:
+    """Koneksi yang membaca normal tetapi setiap batch insert gagal (mis. database terkunci)."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def executemany(self, *args):
+        raise sqlite3.OperationalError("database is locked")
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def test_failed_flush_requeues_batch_in_order(make_store):
+    store = make_store()
+    store.append("s", "user", "m1")
+    store.append("s", "user", "m2")
+
+    real_conn = store._conn
+    store._conn = _FailingWrites(real_conn)
+    with pytest.raises(sqlite3.OperationalError):
+        store.flush()
+    store._conn = real_conn
+
+    store.append("s", "user", "m3")
+    assert [item[2] for item in store._pending] == ["m1", "m2", "m3"]
+
+    store.flush()
+    assert [content for _, content in _db_rows(store, "s")] == ["m1", "m2", "m3"]
+
+
+def test_rehydrate_reads_queue_without_flushing(make_store):
+    store = make_store(max_sessions=1)
+    store.append("old", "user", "tersimpan")
+    store.flush()
+    store._conn = _FailingWrites(store._conn)
+    store.append("old", "assistant", "masih di antrean")
+    store.append("other", "user", "x")  # "old" dikeluarkan dari memori
+
+    # Sesi baru dan sesi lama dimuat ulang tanpa flush; error flush tidak sampai ke pemanggil
+    assert store.count("brand-new-session") == 0
+    assert store.count("old") == 2
+    assert [m["content"] for m in store.get_messages("old")] == ["tersimpan", "masih di antrean"]
+    assert [m["content"] for m in store.get_history("old", limit=1)] == ["masih di antrean"]
+    assert len(store._pending) == 2
+
+    store._conn = store._conn._conn
+    store.flush()
+    assert _db_rows(store, "old") == [("user", "tersimpan"), ("assistant", "masih di antrean")]
+
+
+def test_pending_queue_is_capped(make_store):
+    store = make_store(max_pending=3)
+    store._conn = _FailingWrites(store._conn)
+    for i in range(5):
+        store.append("s", "user", f"m{i}")
+    with pytest.raises(sqlite3.OperationalError):
+        store.flush()
+
+    assert [item[2] for item in store._pending] == ["m2", "m3", "m4"]
+    assert store.dropped == 2
+    store._conn = store._conn._conn
+
+
+def test_session_id_validation():
+    assert is_valid_session_id(new_session_id())
+    assert not is_valid_session_id("1")
+    assert not is_valid_session_id(None)
+    assert not is_valid_session_id("00000000-0000-1000-8000-000000000000")  # bukan uuid4
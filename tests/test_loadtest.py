@@ -0,0 +1,48 @@
+import contextvars
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+import loadtest  # noqa: E402
+from resilience import hedged_call  # noqa: E402
+
+
+def _agent_like_turn(label):
+    """Print dari thread pemanggil, thread tool (copy_context), dan thread hedged_call."""
+    print(f">> giliran {label}")
+    with ThreadPoolExecutor(max_workers=1) as tool_pool:
+        tool_pool.submit(contextvars.copy_context().run, print, f"Error executing SQL query: {label}").result()
+    hedged_call(print, f"Peringatan: embedding lambat {label}", timeout=1)
+
+
+def test_turn_output_is_captured_per_turn(capsys):
+    captured = {}
+
+    def session(label):
+        with loadtest.capture_turn() as output:
+            _agent_like_turn(label)
+        captured[label] = loadtest.error_lines(output)
+
+    with loadtest.contextlib.redirect_stdout(loadtest.TurnOutputCapture(None)):
+        threads = [threading.Thread(target=session, args=(label,)) for label in ("a", "b")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        print("di luar giliran")
+
+    assert captured["a"] == ["Error executing SQL query: a", "Peringatan: embedding lambat a"]
+    assert captured["b"] == ["Error executing SQL query: b", "Peringatan: embedding lambat b"]
+    assert capsys.readouterr().out == ""  # tanpa --verbose tidak ada yang bocor ke stdout
+
+
+def test_verbose_passthrough_keeps_output(capsys):
+    with loadtest.contextlib.redirect_stdout(loadtest.TurnOutputCapture(sys.stdout)):
+        with loadtest.capture_turn() as output:
+            print("Error saat menjalankan agent: ConnectionError")
+    assert loadtest.error_lines(output) == ["Error saat menjalankan agent: ConnectionError"]
+    assert "ConnectionError" in capsys.readouterr().out
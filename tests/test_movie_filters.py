@@ -0,0 +1,104 @@
+"""Unit test parser constraint (movie_filters.py)."""
+
+import pytest
+
+from movie_filters import build_qdrant_filter, build_sql_where, describe_filters, parse_question_filters
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("film tahun 2000-2010", {"gte": 2000, "lte": 2010}),
+    ("film antara 1995 dan 1990", {"gte": 1990, "lte": 1995}),
+    ("film horor tahun 2000-an", {"gte": 2000, "lte": 2009}),
+    ("film tahun 90an yang seru", {"gte": 1990, "lte": 1999}),
+    ("film '80s", {"gte": 1980, "lte": 1989}),
+    ("film 80's", {"gte": 1980, "lte": 1989}),
+    ("film 1980s", {"gte": 1980, "lte": 1989}),
+    ("film setelah 2010 tapi sebelum 2015", {"gt": 2010, "lt": 2015}),
+    ("film sebelum tahun 2000", {"lt": 2000}),
+    ("film sejak 2015", {"gte": 2015}),
+    ("film rilis 2019", {"gte": 2019, "lte": 2019}),
+])
+def test_year_ranges(question, expected):
+    assert parse_question_filters(question)["year"] == expected
+
+
+@pytest.mark.parametrize("question, key, expected", [
+    ("rating di atas 8.5", "rating", {"gt": 8.5}),
+    ("rating lebih dari 8", "rating", {"gt": 8.0}),
+    ("rating minimal 8,5", "rating", {"gte": 8.5}),
+    ("rating di bawah 9 dan rating minimal 8", "rating", {"lt": 9.0, "gte": 8.0}),
+    ("vote maksimal 500000", "votes", {"lte": 500000}),
+    ("di atas 1 juta vote", "votes", {"gt": 1_000_000}),
+    ("lebih dari 1,5 juta votes", "votes", {"gt": 1_500_000}),
+    ("vote minimal 500rb", "votes", {"gte": 500_000}),
+])
+def test_thresholds(question, key, expected):
+    assert parse_question_filters(question)[key] == expected
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("vote minimal 1.000.000", {"gte": 1_000_000}),
+    ("vote minimal 1,000,000", {"gte": 1_000_000}),
+    ("vote di atas 250.000", {"gt": 250_000}),
+    ("vote minimal 1.000.000, rating di atas 8", {"gte": 1_000_000}),
+])
+def test_thousands_separators(question, expected):
+    assert parse_question_filters(question)["votes"] == expected
+
+
+@pytest.mark.parametrize("question", [
+    "film buat umur 20an",
+    "top 10s film",
+    "film 90an yang seru",
+])
+def test_two_digit_decade_needs_year_context(question):
+    assert "year" not in parse_question_filters(question)
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("film dengan lebih dari 100 votes rating di atas 8", {"rating": {"gt": 8.0}, "votes": {"gt": 100}}),
+    ("di atas 2 jam rating minimal 8", {"rating": {"gte": 8.0}}),
+    ("lebih dari 3 film rating", {}),
+    ("rating di atas 8 dan di atas 500rb vote", {"rating": {"gt": 8.0}, "votes": {"gt": 500_000}}),
+])
+def test_only_unit_between_number_and_keyword(question, expected):
+    constraints = parse_question_filters(question)
+    assert {key: constraints[key] for key in ("rating", "votes") if key in constraints} == expected
+
+
+def test_forward_match_wins_over_reversed():
+    assert parse_question_filters("di atas 7 rating di atas 8")["rating"] == {"gt": 8.0}
+
+
+def test_number_belongs_to_preceding_keyword():
+    constraints = parse_question_filters("vote di atas 250000 rating di bawah 9")
+    assert constraints["votes"] == {"gt": 250_000}
+    assert constraints["rating"] == {"lt": 9.0}
+
+
+def test_genres_and_empty_question():
+    assert parse_question_filters("film drama kriminal")["genres"] == ["Drama", "Crime"]
+    assert parse_question_filters("film tentang perjalanan waktu") == {}
+
+
+def test_build_sql_where_and_describe():
+    constraints = parse_question_filters("film horor setelah 2010 rating di atas 7")
+    where, params = build_sql_where(constraints)
+    assert where == "WHERE released_year > :year_gt AND imdb_rating > :rating_gt AND genre LIKE :genre_0"
+    assert params == {"year_gt": 2010, "rating_gt": 7.0, "genre_0": "%Horror%"}
+    assert describe_filters(constraints) == "tahun > 2010; genre Horror; rating > 7.0"
+    assert build_sql_where({}) == ("", {})
+
+
+def test_build_qdrant_filter():
+    models = pytest.importorskip("qdrant_client.models")
+
+    constraints = parse_question_filters("film sci-fi tahun 2000-an rating di atas 8 vote minimal 1.000.000")
+    qdrant_filter = build_qdrant_filter(constraints)
+
+    conditions = {condition.key: condition for condition in qdrant_filter.must}
+    assert conditions["metadata.year"].range == models.Range(gte=2000, lte=2009)
+    assert conditions["metadata.rating"].range == models.Range(gt=8.0)
+    assert conditions["metadata.votes"].range == models.Range(gte=1_000_000)
+    assert conditions["metadata.genre"].match == models.MatchText(text="Sci-Fi")
+    assert build_qdrant_filter({}) is None
@@ -0,0 +1,88 @@
+"""Test cache poster terhadap server gambar lokal (http.server)."""
+
+import hashlib
+import io
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import poster_cache
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def _png_bytes():
+    output = io.BytesIO()
+    Image.new("RGB", (300, 450), color=(200, 30, 30)).save(output, format="PNG")
+    return output.getvalue()
+
+
+class _ImageServer(BaseHTTPRequestHandler):
+    """Stand-in CDN poster: /poster.png -> gambar, path lain -> 404."""
+
+    image = _png_bytes()
+
+    def do_GET(self):
+        if self.path == "/poster.png":
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(len(self.image)))
+            self.end_headers()
+            self.wfile.write(self.image)
+        else:
+            self.send_error(404)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def image_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ImageServer)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_build_poster_cache(image_server, tmp_path):
+    cache_dir = str(tmp_path / "posters")
+    good_url = f"{image_server}/poster.png"
+    missing_url = f"{image_server}/missing.png"
+
+    added, failed = poster_cache.build_poster_cache([good_url, missing_url, good_url, None, ""], cache_dir=cache_dir)
+    assert (added, failed) == (1, 1)
+
+    # Manifest memetakan URL asli -> nama file berbasis hash isi thumbnail
+    with open(os.path.join(cache_dir, poster_cache.MANIFEST_FILE), encoding="utf-8") as f:
+        manifest = json.load(f)
+    assert list(manifest) == [good_url]
+    filename = manifest[good_url]
+    with open(os.path.join(cache_dir, filename), "rb") as f:
+        thumbnail = f.read()
+    assert filename == hashlib.sha256(thumbnail).hexdigest() + ".jpg"
+    with Image.open(io.BytesIO(thumbnail)) as image:
+        assert image.format == "JPEG"
+        assert image.size[0] <= poster_cache.THUMBNAIL_SIZE[0]
+        assert image.size[1] <= poster_cache.THUMBNAIL_SIZE[1]
+
+    # URL lokal untuk poster ter-cache; URL asli untuk yang gagal (404)
+    local_url = f"{poster_cache.POSTER_URL_PREFIX}/{filename}"
+    assert poster_cache.local_poster_url(good_url, cache_dir) == local_url
+    assert poster_cache.local_poster_url(missing_url, cache_dir) == missing_url
+
+    text = f"Filmnya ||POSTER||{good_url}. Lainnya (||POSTER||{missing_url}) dan [||POSTER||{good_url}]"
+    assert poster_cache.localize_poster_tags(text, cache_dir) == (
+        f"Filmnya ||POSTER||{local_url}. Lainnya (||POSTER||{missing_url}) dan [||POSTER||{local_url}]"
+    )
+
+    # Build ulang: poster yang sudah ada di cache tidak diunduh lagi
+    assert poster_cache.build_poster_cache([good_url], cache_dir=cache_dir) == (0, 0)
+
+
+def test_local_poster_url_without_manifest(tmp_path):
+    url = "https://example.com/poster.jpg"
+    assert poster_cache.local_poster_url(url, str(tmp_path)) == url
+    assert poster_cache.localize_poster_tags(f"||POSTER||{url}", str(tmp_path)) == f"||POSTER||{url}"
@@ -0,0 +1,134 @@
+import os
+
+import pandas as pd
+import pytest
+
+import preprocessing
+
+SAMPLE_CSV = os.path.join(os.path.dirname(__file__), "..", "data", "imdb_top_1000_cleaned.csv")
+
+
+@pytest.fixture
+def sample_csv(tmp_path):
+    path = tmp_path / "movies.csv"
+    pd.read_csv(SAMPLE_CSV, dtype=str).head(5).to_csv(path, index=False)
+    return str(path)
+
+
+def test_artifact_stores_fingerprint(sample_csv, tmp_path):
+    artifact = str(tmp_path / "movies.parquet")
+    df = preprocessing.load_movies(artifact, sample_csv)
+
+    assert len(df) == 5
+    assert preprocessing.artifact_fingerprint(artifact) == preprocessing.preprocessing_fingerprint()
+    assert str(df["Released_Year"].dtype) == "Int32"
+
+
+def test_load_movies_reuses_fresh_artifact(sample_csv, tmp_path, monkeypatch):
+    artifact = str(tmp_path / "movies.parquet")
+    preprocessing.load_movies(artifact, sample_csv)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("artifact tidak boleh dibangun ulang")
+
+    monkeypatch.setattr(preprocessing, "build_artifact", fail)
+    assert len(preprocessing.load_movies(artifact, sample_csv)) == 5
+
+
+def test_load_movies_rebuilds_on_version_change(sample_csv, tmp_path, monkeypatch):
+    artifact = str(tmp_path / "movies.parquet")
+    preprocessing.load_movies(artifact, sample_csv)
+    old_fingerprint = preprocessing.artifact_fingerprint(artifact)
+    # CSV sengaja dibuat lebih tua agar hanya fingerprint yang memicu rebuild
+    os.utime(sample_csv, (0, 0))
+
+    monkeypatch.setattr(preprocessing, "PREPROCESSING_VERSION", preprocessing.PREPROCESSING_VERSION + 1)
+    preprocessing.load_movies(artifact, sample_csv)
+
+    new_fingerprint = preprocessing.artifact_fingerprint(artifact)
+    assert new_fingerprint != old_fingerprint
+    assert new_fingerprint == preprocessing.preprocessing_fingerprint()
+
+
+def test_artifact_without_fingerprint_is_rebuilt(sample_csv, tmp_path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    artifact = str(tmp_path / "movies.parquet")
+    df = preprocessing.clean_movies(pd.read_csv(sample_csv, dtype=str))
+    pq.write_table(pa.Table.from_pandas(df, schema=preprocessing.ARTIFACT_SCHEMA, preserve_index=False), artifact)
+    os.utime(sample_csv, (0, 0))
+    assert preprocessing.artifact_fingerprint(artifact) is None
+
+    preprocessing.load_movies(artifact, sample_csv)
+    assert preprocessing.artifact_fingerprint(artifact) == preprocessing.preprocessing_fingerprint()
+
+
+def _raw_frame():
+    """Frame mentah kecil seperti CSV sumber (semua kolom string)."""
+    return pd.DataFrame({
+        "Poster_Link": ["https://m.media-amazon.com/a.jpg", "https://m.media-amazon.com/b.jpg"],
+        "Series_Title": ["Apollo 13", " Drishyam "],
+        "Released_Year": ["PG", "2013"],
+        "Certificate": ["U", "U/A"],
+        "Runtime": ["140 min", "142 min"],
+        "Genre": ["Adventure, Drama,History", "Crime, Drama, Thriller"],
+        "IMDB_Rating": ["7.6", "8.3"],
+        "Overview": ["NASA must devise a strategy to return Apollo 13 to Earth.", ""],
+        "Meta_score": ["77", None],
+        "Director": ["Ron Howard", "Jeethu Joseph"],
+        "Star1": ["Tom Hanks", "Mohanlal"],
+        "Star2": ["Bill Paxton", None],
+        "Star3": ["Kevin Bacon", "Asha Sharath"],
+        "Star4": ["Gary Sinise", "Ansiba Hassan"],
+        "No_of_Votes": ["269197", "30722"],
+        "Gross": ["173,837,933", None],
+    }, dtype=object)
+
+
+def test_clean_movies_parses_numbers_and_overrides():
+    df = preprocessing.clean_movies(_raw_frame())
+
+    assert list(df.columns) == preprocessing.ARTIFACT_SCHEMA.names
+    assert df["Released_Year"].tolist() == [1995, 2013]  # 'PG' diperbaiki lewat YEAR_OVERRIDES
+    assert df["Runtime"].tolist() == [140, 142]
+    assert df["Gross"].tolist() == [173_837_933.0, 0.0]
+    assert df["Meta_score"].tolist() == [77.0, 0.0]
+    assert df["No_of_Votes"].tolist() == [269197, 30722]
+    assert df["Certificate"].tolist() == ["U", "UA"]
+    assert df["Series_Title"].tolist() == ["Apollo 13", "Drishyam"]
+
+
+def test_clean_movies_splits_genres():
+    df = preprocessing.clean_movies(_raw_frame())
+    assert df["Genre_List"].tolist() == [["Adventure", "Drama", "History"], ["Crime", "Drama", "Thriller"]]
+
+
+def test_embedding_text_skips_missing_star_and_overview():
+    text = preprocessing.clean_movies(_raw_frame())["text_for_embedding"].tolist()
+
+    assert text[0] == (
+        "Judul: Apollo 13; Genre: Adventure, Drama,History; Sutradara: Ron Howard; "
+        "Pemeran: Tom Hanks, Bill Paxton, Kevin Bacon; "
+        "Sinopsis: NASA must devise a strategy to return Apollo 13 to Earth."
+    )
+    assert text[1] == (
+        "Judul: Drishyam; Genre: Crime, Drama, Thriller; Sutradara: Jeethu Joseph; "
+        "Pemeran: Mohanlal, Asha Sharath; Sinopsis: "
+    )
+
+
+def test_to_sql_rows_turns_na_into_none():
+    raw = _raw_frame()
+    raw.loc[1, "Released_Year"] = "rusak"
+    raw.loc[1, "Runtime"] = None
+    rows = preprocessing.to_sql_rows(preprocessing.clean_movies(raw))
+
+    columns = list(preprocessing.SQL_COLUMNS)
+    drishyam = dict(zip(columns, rows[1]))
+    assert drishyam["Released_Year"] is None
+    assert drishyam["Runtime"] is None
+    assert drishyam["Overview"] is None
+    assert drishyam["Star2"] is None
+    assert drishyam["Certificate"] == "UA"
+    assert dict(zip(columns, rows[0]))["Released_Year"] == 1995
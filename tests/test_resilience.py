@@ -0,0 +1,442 @@
+"""Test kontrol tail-latency terhadap stand-in embedding/Qdrant lokal (http.server) yang lambat atau 5xx."""
+
+import json
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import resilience
+import startup_profile
+from resilience import (
+    BudgetExhausted, CircuitBreaker, CircuitOpenError, DeadlineExceeded, hedged_call, is_dependency_failure,
+    remaining_budget, stage_timeout, turn_budget,
+)
+
+
+class _StandIn(BaseHTTPRequestHandler):
+    """Stand-in dependensi remote: jeda dan status diatur per test lewat atribut `server`."""
+
+    def do_POST(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            delay = server.delays.pop(0) if server.delays else server.default_delay
+        time.sleep(delay)
+        if server.status >= 500:
+            self.send_error(server.status)
+            return
+        body = json.dumps({"embedding": [0.1, 0.2, 0.3], "delay": delay}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stand_in():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StandIn)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.delays = []
+    server.default_delay = 0.0
+    server.status = 200
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/embed"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+
+
+def _post(url, timeout=5):
+    request = urllib.request.Request(url, data=b"{}", method="POST")
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+@pytest.fixture
+def fresh_breakers(monkeypatch):
+    monkeypatch.setattr(resilience, "_breakers", {})
+
+
+# Hedged request & deadline
+def test_hedged_request_wins_over_slow_primary(stand_in):
+    stand_in.delays = [1.5, 0.0]
+    start = time.monotonic()
+    result = hedged_call(_post, stand_in.url, timeout=3, hedge_after=0.1)
+    elapsed = time.monotonic() - start
+
+    assert result["delay"] == 0.0
+    assert elapsed < 1.0
+    assert stand_in.requests == 2
+
+
+def test_deadline_exceeded_when_every_attempt_is_slow(stand_in):
+    stand_in.default_delay = 1.0
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        hedged_call(_post, stand_in.url, timeout=0.3, hedge_after=0.1)
+    assert time.monotonic() - start < 0.8
+
+
+def test_5xx_is_retried_once_then_raised(stand_in):
+    stand_in.status = 503
+    with pytest.raises(urllib.error.HTTPError):
+        hedged_call(_post, stand_in.url, timeout=2, hedge_after=1)
+    assert stand_in.requests == 2
+
+
+def test_turn_budget_caps_stage_deadlines(stand_in):
+    stand_in.default_delay = 1.0
+    with turn_budget(0.3):
+        assert stage_timeout(30) <= 0.3
+        start = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            hedged_call(_post, stand_in.url, timeout=5, hedge_after=5)
+        assert time.monotonic() - start < 0.8
+        # Budget sudah habis: tahap berikutnya langsung gagal tanpa memanggil dependensi
+        requests = stand_in.requests
+        with pytest.raises(DeadlineExceeded):
+            hedged_call(_post, stand_in.url, timeout=5)
+        assert stand_in.requests == requests
+    assert remaining_budget() is None
+
+
+def test_nested_turn_budget_cannot_extend_outer():
+    with turn_budget(0.5):
+        with turn_budget(60):
+            assert remaining_budget() <= 0.5
+
+
+# Circuit breaker
+def test_breaker_opens_then_half_opens(stand_in):
+    breaker = CircuitBreaker("stand-in", failure_threshold=2, reset_timeout=0.2)
+    stand_in.status = 503
+    for _ in range(2):
+        with pytest.raises(urllib.error.HTTPError):
+            breaker.call(_post, stand_in.url)
+    assert breaker.state == "open"
+
+    # Open: panggilan ditolak tanpa menyentuh dependensi
+    with pytest.raises(CircuitOpenError):
+        breaker.call(_post, stand_in.url)
+    assert stand_in.requests == 2
+
+    time.sleep(0.25)
+    assert breaker.state == "half-open"
+    stand_in.status = 200
+    assert breaker.call(_post, stand_in.url)["embedding"]
+    assert breaker.state == "closed"
+
+
+def test_budget_and_local_errors_do_not_open_breaker(stand_in):
+    breaker = CircuitBreaker("stand-in", failure_threshold=1)
+    with turn_budget(0):
+        for _ in range(3):
+            with pytest.raises(BudgetExhausted):
+                breaker.call(hedged_call, _post, stand_in.url, timeout=5)
+    with pytest.raises(ValueError):
+        breaker.call(int, "bukan angka")
+    assert breaker.state == "closed"
+    assert stand_in.requests == 0
+
+
+@pytest.mark.parametrize("error, expected", [
+    (DeadlineExceeded("tahap lambat"), True),
+    (BudgetExhausted("budget habis"), False),
+    (ConnectionError("reset"), True),
+    (urllib.error.HTTPError("http://x", 503, "Unavailable", {}, None), True),
+    (urllib.error.HTTPError("http://x", 429, "Too Many Requests", {}, None), True),
+    (urllib.error.HTTPError("http://x", 400, "Bad Request", {}, None), False),
+    (type("APITimeoutError", (type("APIConnectionError", (Exception,), {}),), {})(), True),
+    (sqlite3.OperationalError("no such column"), False),
+    (KeyError("messages"), False),
+])
+def test_is_dependency_failure(error, expected):
+    assert is_dependency_failure(error) is expected
+
+
+def test_failed_half_open_trial_reopens(stand_in):
+    breaker = CircuitBreaker("stand-in", failure_threshold=1, reset_timeout=0.1)
+    stand_in.status = 500
+    with pytest.raises(urllib.error.HTTPError):
+        breaker.call(_post, stand_in.url)
+    time.sleep(0.15)
+    assert breaker.allow()
+    assert not breaker.allow()  # hanya satu percobaan saat half-open
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+
+# Jalur degraded movie_agent
+pytest.importorskip("langchain_core")
+
+
+@pytest.fixture
+def movies_db(tmp_path, monkeypatch):
+    import movie_agent
+
+    path = str(tmp_path / "movies.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE movies (id INTEGER PRIMARY KEY, poster_link TEXT, title TEXT, released_year INTEGER, "
+        "certificate TEXT, runtime INTEGER, genre TEXT, imdb_rating REAL, overview TEXT, meta_score REAL, "
+        "director TEXT, star1 TEXT, star2 TEXT, star3 TEXT, star4 TEXT, no_of_votes INTEGER, gross REAL)"
+    )
+    # 300 film dengan rating lebih tinggi dari Titanic: melebihi row cap sql_guard (MAX_ROWS)
+    rows = [
+        (f"Film Unggulan {i}", 2000, "Drama", 9.0 - i / 1000, "Kisah keluarga di kota kecil.", f"Sutradara {i}")
+        for i in range(300)
+    ]
+    rows.append(("Titanic", 1997, "Drama, Romance", 7.8, "Kapal mewah tenggelam di pelayaran perdananya.", "James Cameron"))
+    conn.executemany(
+        "INSERT INTO movies (title, released_year, genre, imdb_rating, overview, director) VALUES (?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(movie_agent, "SQL_DB_PATH", path)
+    return path
+
+
+@pytest.fixture
+def agent_module(monkeypatch, fresh_breakers):
+    import movie_agent
+
+    monkeypatch.setattr(movie_agent, "answer_caches", {"rag": resilience.AnswerCache(), "agent": resilience.AnswerCache()})
+    return movie_agent
+
+
+class _RemoteEmbeddings:
+    """Embedding palsu yang memanggil stand-in HTTP (lambat/5xx sesuai konfigurasi server)."""
+
+    def __init__(self, url):
+        self.url = url
+
+    def embed_query(self, text):
+        return _post(self.url)["embedding"]
+
+
+class _StaticStore:
+    def similarity_search_by_vector(self, vector, k=3, filter=None):
+        from langchain_core.documents import Document
+        return [Document(
+            page_content="Judul: Inception; Sinopsis: Pencuri mimpi.",
+            metadata={"title": "Inception", "year": 2010, "rating": 8.8, "genre": "Sci-Fi", "poster": None},
+        )]
+
+
+def test_search_keywords_drop_stopwords(agent_module):
+    assert agent_module.search_keywords("Film yang mirip Titanic, tenggelam!") == ["titanic", "tenggelam"]
+
+
+def test_local_search_ranks_whole_table(agent_module, movies_db):
+    results = agent_module.search_movies_locally("film mirip Titanic tenggelam", {})
+    assert results[0].metadata["title"] == "Titanic"
+    assert len(results) == 3
+
+
+def test_local_search_applies_constraints(agent_module, movies_db):
+    results = agent_module.search_movies_locally("film mirip Titanic", {"year": {"gte": 1999}})
+    assert "Titanic" not in [doc.metadata["title"] for doc in results]
+
+
+def test_unhealthy_embeddings_serve_local_search(agent_module, movies_db, stand_in, monkeypatch):
+    stand_in.status = 503
+    monkeypatch.setitem(startup_profile._resources, "embeddings", _RemoteEmbeddings(stand_in.url))
+    monkeypatch.setitem(startup_profile._resources, "qdrant", _StaticStore())
+
+    answer = agent_module.get_movie_recommendations("film mirip Titanic tenggelam")
+    assert answer.startswith("Pencarian semantik sedang tidak tersedia")
+    assert "Judul: Titanic" in answer
+
+    # Setelah breaker open, embedding tidak dipanggil lagi dan jalur lokal tetap melayani
+    for _ in range(resilience.FAILURE_THRESHOLD):
+        agent_module.get_movie_recommendations("film mirip Titanic tenggelam")
+    requests = stand_in.requests
+    assert resilience.get_breaker("openai-embeddings").state == "open"
+    assert "Judul: Titanic" in agent_module.get_movie_recommendations("film mirip Titanic tenggelam")
+    assert stand_in.requests == requests
+
+
+def test_cached_rag_answer_served_when_dependency_fails(agent_module, stand_in, monkeypatch):
+    monkeypatch.setitem(startup_profile._resources, "embeddings", _RemoteEmbeddings(stand_in.url))
+    monkeypatch.setitem(startup_profile._resources, "qdrant", _StaticStore())
+    healthy = agent_module.get_movie_recommendations("film mimpi berlapis")
+    assert "Judul: Inception" in healthy
+
+    def no_local_search(*args, **kwargs):
+        raise AssertionError("jawaban cache seharusnya dipakai")
+
+    monkeypatch.setattr(agent_module, "search_movies_locally", no_local_search)
+    stand_in.status = 500
+    assert agent_module.get_movie_recommendations("Film  mimpi berlapis") == healthy
+
+
+class _ScriptedAgent:
+    """Agent palsu: satu jawaban per stream, atau error/lambat sesuai mode."""
+
+    def __init__(self):
+        self.mode = "ok"
+
+    def stream(self, state, stream_mode=None, config=None):
+        from langchain_core.messages import AIMessage
+        if self.mode == "error":
+            raise ConnectionError("stand-in OpenAI 503")
+        if self.mode == "slow":
+            for _ in range(50):
+                time.sleep(0.02)
+                yield {"messages": [*state["messages"], AIMessage(content="belum selesai")]}
+            return
+        yield {"messages": [*state["messages"], AIMessage(content=f"jawaban untuk: {state['messages'][-1].content}")]}
+
+
+def test_agent_fallback_cache_is_scoped_to_session(agent_module, monkeypatch):
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    agent = _ScriptedAgent()
+    monkeypatch.setitem(startup_profile._resources, "agent", agent)
+
+    def ask(history, question, session_id):
+        # Seperti main.py: pertanyaan dan jawaban setiap giliran ditambahkan ke riwayat
+        history.append(HumanMessage(content=question))
+        turn = agent_module.run_agent_turn(history, question, session_id=session_id)
+        history.append(AIMessage(content=turn["answer"]))
+        return turn
+
+    history_a = [AIMessage(content=agent_module.GREETING)]
+    first = ask(history_a, "film horor terbaik?", "sesi-a")
+    assert first["ok"] and first["answer"] == "jawaban untuk: film horor terbaik?"
+    ask(history_a, "yang kedua gimana?", "sesi-a")
+
+    # Riwayat sudah bertambah, tetapi pertanyaan yang sama di sesi yang sama tetap kena cache
+    agent.mode = "error"
+    repeated = ask(history_a, "Film horor  terbaik?", "sesi-a")
+    other_session = ask([AIMessage(content=agent_module.GREETING)], "film horor terbaik?", "sesi-b")
+    new_question = ask(history_a, "film komedi?", "sesi-a")
+
+    assert not repeated["ok"] and repeated["answer"] == first["answer"]
+    assert other_session["answer"] == agent_module.DEGRADED_ANSWER
+    assert new_question["answer"] == agent_module.DEGRADED_ANSWER
+
+
+def test_exhausted_budget_leaves_breakers_closed(agent_module, monkeypatch):
+    from langchain_core.messages import HumanMessage
+
+    calls = []
+
+    class CountingEmbeddings:
+        def embed_query(self, text):
+            calls.append(text)
+            return [0.1, 0.2, 0.3]
+
+    monkeypatch.setitem(startup_profile._resources, "embeddings", CountingEmbeddings())
+    monkeypatch.setitem(startup_profile._resources, "qdrant", _StaticStore())
+    with turn_budget(0):
+        for _ in range(resilience.FAILURE_THRESHOLD):
+            with pytest.raises(BudgetExhausted):
+                agent_module.search_vector_store("film mimpi", None)
+    assert calls == []
+    assert resilience.get_breaker("openai-embeddings").state == "closed"
+
+    # Giliran yang kehabisan budget (mis. sub-agent SQL lambat) tidak membuka breaker chat
+    agent = _ScriptedAgent()
+    agent.mode = "slow"
+    monkeypatch.setitem(startup_profile._resources, "agent", agent)
+    for _ in range(resilience.FAILURE_THRESHOLD):
+        turn = agent_module.run_agent_turn([HumanMessage(content="halo")], "halo", session_id="s", turn_timeout=0.05)
+        assert not turn["ok"]
+    assert resilience.get_breaker("openai-chat").state == "closed"
+
+    agent.mode = "error"
+    for _ in range(resilience.FAILURE_THRESHOLD):
+        agent_module.run_agent_turn([HumanMessage(content="halo")], "halo", session_id="s")
+    assert resilience.get_breaker("openai-chat").state == "open"
+
+
+def test_agent_turn_stops_at_turn_budget(agent_module, monkeypatch):
+    from langchain_core.messages import HumanMessage
+
+    agent = _ScriptedAgent()
+    agent.mode = "slow"
+    monkeypatch.setitem(startup_profile._resources, "agent", agent)
+
+    start = time.monotonic()
+    turn = agent_module.run_agent_turn([HumanMessage(content="halo")], "halo", session_id="s", turn_timeout=0.2)
+    assert time.monotonic() - start < 0.6
+    assert not turn["ok"]
+    assert turn["answer"] == agent_module.DEGRADED_ANSWER
+
+
+def test_turn_budget_reaches_agent_tool_threads(monkeypatch):
+    pytest.importorskip("langchain")
+    from langchain.agents import create_agent
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.messages import AIMessage
+    from langchain_core.outputs import ChatGeneration, ChatResult
+    from langchain_core.tools import tool
+
+    seen = []
+
+    @tool
+    def probe(question: str) -> str:
+        """Catat sisa budget giliran dari dalam tool."""
+        seen.append(remaining_budget())
+        return "ok"
+
+    class ToolThenAnswer(BaseChatModel):
+        @property
+        def _llm_type(self):
+            return "tool-then-answer"
+
+        def bind_tools(self, tools, **kwargs):
+            return self
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            if messages[-1].type == "tool":
+                message = AIMessage(content="selesai")
+            else:
+                message = AIMessage(content="", tool_calls=[{"name": "probe", "args": {"question": "x"}, "id": "call-1"}])
+            return ChatResult(generations=[ChatGeneration(message=message)])
+
+    agent = create_agent(ToolThenAnswer(), [probe])
+    with turn_budget(5):
+        agent.invoke({"messages": [{"role": "user", "content": "x"}]})
+
+    assert len(seen) == 1 and seen[0] is not None and 0 < seen[0] <= 5
+
+
+# Kedalaman antrean executor hedged
+def test_pending_hedged_calls_counts_queued_attempts():
+    release = threading.Event()
+    blockers = [resilience._submit(release.wait, 5) for _ in range(resilience.HEDGE_WORKERS)]
+    try:
+        deadline = time.monotonic() + 2
+        while resilience.pending_hedged_calls() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert resilience.pending_hedged_calls() == 0  # semua blocker sudah mendapat worker
+
+        queued = [resilience._submit(time.sleep, 0) for _ in range(3)]
+        assert resilience.pending_hedged_calls() == 3
+        assert queued[0].cancel()
+        assert resilience.pending_hedged_calls() == 2
+    finally:
+        release.set()
+    for future in blockers + queued:
+        if not future.cancelled():
+            future.result(timeout=5)
+    assert resilience.pending_hedged_calls() == 0
+
+
+def test_hedged_attempts_run_in_caller_context():
+    with turn_budget(5):
+        remaining = hedged_call(remaining_budget, timeout=1)
+    assert remaining is not None and 0 < remaining <= 5
@@ -0,0 +1,137 @@
+import sqlite3
+
+import pytest
+
+pytest.importorskip("langchain_community")
+
+import sql_cache  # noqa: E402
+from sql_cache import SQLResultCache, bump_db_version, db_version, normalize_sql  # noqa: E402
+
+
+@pytest.fixture
+def movies_db(tmp_path):
+    path = str(tmp_path / "movies.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE movies (title TEXT, released_year INTEGER, gross REAL)")
+    conn.executemany(
+        "INSERT INTO movies VALUES (?, ?, ?)",
+        [("Titanic", 1997, 659325379.0), ("Avatar", 2009, 760507625.0), ("Up", 2009, 293004164.0)],
+    )
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.mark.parametrize("a, b", [
+    ("SELECT title FROM movies", "select   title\n  from MOVIES;"),
+    ("SELECT * FROM movies WHERE released_year IN (2009, 1997)", "select * from movies where released_year in(1997,2009)"),
+    ("SELECT * FROM movies WHERE title IN ('Up', 'Avatar')", "SELECT * FROM movies WHERE title IN ('Avatar','Up','Up')"),
+    ("SELECT count( * ) FROM movies WHERE gross > 1", "SELECT COUNT(*) FROM movies WHERE gross>1"),
+])
+def test_normalize_sql_equivalent(a, b):
+    assert normalize_sql(a) == normalize_sql(b)
+
+
+@pytest.mark.parametrize("a, b", [
+    # Literal string tetap case-sensitive dan spasinya tidak diubah
+    ("SELECT * FROM movies WHERE title = 'Up'", "SELECT * FROM movies WHERE title = 'UP'"),
+    ("SELECT * FROM movies WHERE title = 'a  b'", "SELECT * FROM movies WHERE title = 'a b'"),
+    ("SELECT title FROM movies", "SELECT title FROM movies LIMIT 1"),
+])
+def test_normalize_sql_distinct(a, b):
+    assert normalize_sql(a) != normalize_sql(b)
+
+
+def test_roundtrip_and_compression(movies_db):
+    cache = SQLResultCache(movies_db)
+    small, large = "[('Up',)]", "x" * (sql_cache.COMPRESS_THRESHOLD * 4)
+    cache.put("small", small)
+    cache.put("large", large)
+
+    assert cache.get("small") == small
+    assert cache.get("large") == large
+    assert cache.get("missing") is None
+    assert (cache.hits, cache.misses) == (2, 1)
+    # Nilai besar disimpan terkompresi -> jauh lebih kecil dari teks aslinya
+    assert cache._size < len(large)
+
+
+def test_lru_byte_cap_evicts_least_recently_used(movies_db):
+    cache = SQLResultCache(movies_db, max_bytes=30)
+    cache.put("a", "a" * 10)
+    cache.put("b", "b" * 10)
+    cache.put("c", "c" * 10)
+    cache.get("a")  # "a" jadi paling baru dipakai
+    cache.put("d", "d" * 10)
+
+    assert cache.get("b") is None
+    assert [cache.get(key) is not None for key in ("a", "c", "d")] == [True, True, True]
+    assert cache._size <= cache.max_bytes
+
+
+def test_value_larger_than_cap_is_not_cached(movies_db):
+    cache = SQLResultCache(movies_db, max_bytes=8)
+    cache.put("big", "0123456789")
+    assert cache.get("big") is None
+    assert cache._size == 0
+
+
+def test_bump_db_version_invalidates_entries(movies_db):
+    cache = SQLResultCache(movies_db)
+    before = cache.version()
+    cache.put((before, "q"), "hasil lama")
+
+    stat_before = db_version(movies_db)
+    bump_db_version(movies_db)
+    assert db_version(movies_db) != stat_before
+
+    after = cache.version()
+    assert after != before
+    assert after[0] == before[0] + 1  # PRAGMA user_version naik
+    assert cache.get((before, "q")) is None
+
+
+def test_version_is_stable_without_writes(movies_db):
+    cache = SQLResultCache(movies_db)
+    version = cache.version()
+    cache.put((version, "q"), "hasil")
+    assert cache.version() == version
+    assert cache.get((version, "q")) == "hasil"
+
+
+def test_cached_sql_database_serves_repeated_queries(movies_db, monkeypatch):
+    from sqlalchemy import create_engine
+
+    monkeypatch.setattr(sql_cache, "_caches", {})
+    db = sql_cache.CachedSQLDatabase(create_engine(f"sqlite:///{movies_db}"))
+
+    first = db.run("SELECT title FROM movies WHERE released_year IN (2009, 1997) ORDER BY title")
+    second = db.run("select title from movies where released_year in (1997,2009) order by title;")
+    assert first == second
+    assert (db.result_cache.hits, db.result_cache.misses) == (1, 1)
+
+    conn = sqlite3.connect(movies_db)
+    conn.execute("DELETE FROM movies WHERE title = 'Up'")
+    conn.commit()
+    conn.close()
+    bump_db_version(movies_db)
+
+    third = db.run("SELECT title FROM movies WHERE released_year IN (2009, 1997) ORDER BY title")
+    assert "Up" not in third
+    assert db.result_cache.misses == 2
+
+
+def test_import_dataframe_bumps_db_version(tmp_path):
+    import pandas as pd
+
+    from import_movies import import_dataframe_to_db
+    from preprocessing import SQL_COLUMNS
+
+    db_path = str(tmp_path / "movies.db")
+    df = pd.DataFrame([{column: None for column in SQL_COLUMNS}])
+    df["Series_Title"] = "Up"
+
+    import_dataframe_to_db(df, db_path)
+    first = SQLResultCache(db_path).version()
+    import_dataframe_to_db(df, db_path)
+    assert SQLResultCache(db_path).version()[0] == first[0] + 1
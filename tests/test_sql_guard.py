@@ -0,0 +1,137 @@
+import sqlite3
+import time
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from sql_guard import QueryRejectedError, _limit_rows, create_readonly_engine, find_cartesian_scans
+
+INFINITE_QUERY = (
+    "WITH RECURSIVE counter(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM counter) "
+    "SELECT max(x) FROM counter"
+)
+
+
+@pytest.fixture
+def movies_db(tmp_path):
+    path = str(tmp_path / "movies.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE movies (id INTEGER PRIMARY KEY, title TEXT, director TEXT, released_year INTEGER)")
+    conn.execute("CREATE TABLE directors (name TEXT)")
+    conn.executemany(
+        "INSERT INTO movies (title, director, released_year) VALUES (?, ?, ?)",
+        [(f"Film {i}", f"Sutradara {i % 7}", 1950 + i % 70) for i in range(500)],
+    )
+    conn.executemany("INSERT INTO directors VALUES (?)", [(f"Sutradara {i}",) for i in range(7)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def make_engine(movies_db):
+    engines = []
+
+    def factory(**kwargs):
+        engine = create_readonly_engine(movies_db, **kwargs)
+        engines.append(engine)
+        return engine
+
+    yield factory
+    for engine in engines:
+        engine.dispose()
+
+
+def _run(engine, sql):
+    with engine.connect() as conn:
+        return conn.execute(text(sql)).fetchall()
+
+
+def test_find_cartesian_scans_on_plan_rows():
+    safe = [(2, 0, 0, "SCAN movies"), (5, 0, 0, "SEARCH directors USING INDEX idx (name=?)")]
+    nested = [(2, 0, 0, "SCAN movies"), (4, 0, 0, "SCAN directors")]
+    correlated = [
+        (2, 0, 0, "SCAN movies"),
+        (5, 0, 0, "CORRELATED SCALAR SUBQUERY 1"),
+        (8, 5, 0, "SCAN directors"),
+    ]
+    constant = [(2, 0, 0, "SCAN CONSTANT ROW"), (3, 0, 0, "SCAN movies")]
+
+    assert find_cartesian_scans(safe) == []
+    assert find_cartesian_scans(nested) == ["SCAN movies", "SCAN directors"]
+    assert find_cartesian_scans(correlated) == ["SCAN movies", "SCAN directors"]
+    assert find_cartesian_scans(constant) == []
+
+
+def test_cartesian_join_is_rejected(make_engine):
+    engine = make_engine()
+    with pytest.raises(QueryRejectedError, match="cartesian"):
+        _run(engine, "SELECT m.title, d.name FROM movies m, directors d")
+
+
+def test_indexed_join_is_allowed(make_engine):
+    engine = make_engine()
+    rows = _run(engine, "SELECT d.name, m.title FROM directors d JOIN movies m ON m.id = 1")
+    assert len(rows) == 7
+
+
+def test_limit_rows_wraps_statement():
+    wrapped = _limit_rows("SELECT title FROM movies ORDER BY title; ", 10)
+    assert wrapped == "SELECT * FROM (SELECT title FROM movies ORDER BY title\n) LIMIT 10"
+    # Komentar di akhir query tidak menelan kurung tutup
+    sqlite3.connect(":memory:").execute(_limit_rows("SELECT 1 -- komentar", 5))
+
+
+def test_results_are_capped_at_max_rows(make_engine):
+    engine = make_engine(max_rows=25)
+    assert len(_run(engine, "SELECT title FROM movies")) == 25
+    assert len(_run(engine, "SELECT title FROM movies LIMIT 3")) == 3
+
+
+def test_progress_handler_stops_slow_query(make_engine):
+    engine = make_engine(query_timeout=0.2)
+    start = time.monotonic()
+    with pytest.raises(SQLAlchemyError, match="interrupted"):
+        _run(engine, INFINITE_QUERY)
+    assert time.monotonic() - start < 2
+
+    # Koneksi kembali ke pool tanpa progress handler lama -> query berikutnya normal
+    assert _run(engine, "SELECT count(*) FROM movies") == [(500,)]
+
+
+@pytest.mark.parametrize("statement, reason", [
+    ("INSERT INTO movies (title) VALUES ('Baru')", "readonly"),
+    ("UPDATE movies SET title = 'x'", "readonly"),
+    ("DELETE FROM movies", "readonly"),
+    ("DROP TABLE movies", "readonly"),
+    # Diawali WITH -> dibungkus LIMIT oleh guard, sehingga tidak pernah valid sebagai write
+    ("WITH t AS (SELECT 1) DELETE FROM movies", "syntax error"),
+])
+def test_writes_are_refused(make_engine, movies_db, statement, reason):
+    engine = make_engine()
+    with pytest.raises(SQLAlchemyError, match=reason):
+        with engine.connect() as conn:
+            conn.execute(text(statement))
+            conn.commit()
+
+    conn = sqlite3.connect(movies_db)
+    assert conn.execute("SELECT count(*) FROM movies").fetchone()[0] == 500
+    conn.close()
+
+
+def test_multiple_statements_are_refused(make_engine, movies_db):
+    engine = make_engine()
+    with pytest.raises(SQLAlchemyError, match="one statement"):
+        _run(engine, "SELECT 1; DELETE FROM movies")
+
+    conn = sqlite3.connect(movies_db)
+    assert conn.execute("SELECT count(*) FROM movies").fetchone()[0] == 500
+    conn.close()
+
+
+def test_pool_reuses_connections(make_engine):
+    engine = make_engine(pool_size=2)
+    for _ in range(10):
+        _run(engine, "SELECT 1")
+    assert engine.pool.checkedin() <= 2
@@ -0,0 +1,152 @@
+"""Test struktur trace yang dikirim LangfuseExporter (client Langfuse palsu)."""
+
+import json
+from datetime import timedelta
+
+import pytest
+
+pytest.importorskip("langfuse")
+
+from langchain_core.callbacks import CallbackManager  # noqa: E402
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+from langchain_core.outputs import ChatGeneration, LLMResult  # noqa: E402
+
+from tracing import LangfuseExporter, Tracer, TurnTrace, TurnTraceHandler  # noqa: E402
+
+_MESSAGES = [[HumanMessage(content="Top 5 film rating tertinggi")]]
+
+
+class _FakeIngestion:
+    def __init__(self):
+        self.batches = []
+
+    def batch(self, *, batch):
+        self.batches.append(batch)
+        return type("Response", (), {"errors": []})()
+
+
+class _FakeClient:
+    def __init__(self):
+        self.api = type("Api", (), {})()
+        self.api.ingestion = _FakeIngestion()
+
+
+def _llm_call(manager, usage_in_llm_output=True):
+    if usage_in_llm_output:
+        result = LLMResult(
+            generations=[[ChatGeneration(message=AIMessage(content="ok"))]],
+            llm_output={"token_usage": {"prompt_tokens": 900, "completion_tokens": 120, "total_tokens": 1020}},
+        )
+    else:
+        message = AIMessage(content="ok", usage_metadata={"input_tokens": 50, "output_tokens": 5, "total_tokens": 55})
+        result = LLMResult(generations=[[ChatGeneration(message=message)]])
+    for run in manager.on_chat_model_start(
+        {"name": "ChatOpenAI"}, _MESSAGES, invocation_params={"model": "gpt-4o-mini"}
+    ):
+        run.on_llm_end(result)
+
+
+def _simulate_turn(handler):
+    """Agent -> LLM -> tool SQL (sub-agent: LLM -> tool) -> LLM, seperti giliran di main.py."""
+    manager = CallbackManager(handlers=[handler], inheritable_handlers=[handler])
+    agent_run = manager.on_chain_start({"name": "agent"}, {"messages": []})
+    agent = agent_run.get_child()
+    _llm_call(agent)
+    tool_run = agent.on_tool_start({"name": "get_factual_movie_data"}, "top 5 film")
+    sub_run = tool_run.get_child().on_chain_start({"name": "sql_agent"}, {"messages": []})
+    sub_agent = sub_run.get_child()
+    _llm_call(sub_agent, usage_in_llm_output=False)
+    sub_agent.on_tool_start({"name": "sql_db_query"}, "SELECT 1").on_tool_error(ValueError("query ditolak"))
+    sub_run.on_chain_end({"messages": []})
+    tool_run.on_tool_end("jawaban")
+    _llm_call(agent)
+    agent_run.on_chain_end({"messages": []})
+    return agent_run.run_id
+
+
+def _record():
+    tracer = Tracer(None)
+    turn_records = []
+    tracer.enqueue = turn_records.append
+    turn = TurnTrace(tracer, "Query 1", "sesi-1", "user-1", ["test"], "Top 5 film")
+    agent_run_id = _simulate_turn(turn.handler)
+    turn.finish(output="jawaban")
+    return turn_records[0], agent_run_id
+
+
+def _bodies(events, kind):
+    return [event.body for event in events if event.type == kind]
+
+
+def test_handler_records_model_and_normalized_usage():
+    handler = TurnTraceHandler()
+    _simulate_turn(handler)
+    llm_events = [event for event in handler.events if event["kind"] == "llm"]
+
+    assert [event["model"] for event in llm_events] == ["gpt-4o-mini"] * 3
+    # Urutan event = urutan selesai: LLM agent utama, lalu LLM sub-agent (usage dari usage_metadata)
+    assert llm_events[0]["usage"] == {"input": 900, "output": 120, "total": 1020}
+    assert llm_events[1]["usage"] == {"input": 50, "output": 5, "total": 55}
+
+
+def test_exporter_rebuilds_tree_with_recorded_times():
+    record, agent_run_id = _record()
+    client = _FakeClient()
+    LangfuseExporter(client).export([record])
+
+    assert len(client.api.ingestion.batches) == 1
+    events = client.api.ingestion.batches[0]
+
+    (trace,) = _bodies(events, "trace-create")
+    assert (trace.id, trace.name, trace.session_id, trace.user_id) == (record["trace_id"], "Query 1", "sesi-1", "user-1")
+
+    spans = {body.id: body for body in _bodies(events, "span-create")}
+    generations = {body.id: body for body in _bodies(events, "generation-create")}
+    observations = {**spans, **generations}
+    root_id = f"{record['trace_id']}-turn"
+    assert spans[root_id].parent_observation_id is None
+    assert all(body.trace_id == record["trace_id"] for body in observations.values())
+
+    by_name = {}
+    for body in observations.values():
+        by_name.setdefault(body.name, []).append(body)
+
+    # Pohon: root -> agent -> (LLM, tool -> sql_agent -> (LLM, sql_db_query), LLM)
+    (agent,) = by_name["agent"]
+    (tool,) = by_name["get_factual_movie_data"]
+    (sub_agent,) = by_name["sql_agent"]
+    (sql_tool,) = by_name["sql_db_query"]
+    assert agent.id == str(agent_run_id) and agent.parent_observation_id == root_id
+    assert tool.parent_observation_id == agent.id
+    assert sub_agent.parent_observation_id == tool.id
+    assert sql_tool.parent_observation_id == sub_agent.id
+    assert sql_tool.level == "ERROR" and sql_tool.status_message == "query ditolak"
+    assert sorted(body.parent_observation_id for body in generations.values()) == sorted([agent.id, agent.id, sub_agent.id])
+
+    # LLM dikirim sebagai generation dengan model dan usage_details
+    assert len(generations) == 3
+    for body in generations.values():
+        assert body.model == "gpt-4o-mini"
+        assert body.usage_details in ({"input": 900, "output": 120, "total": 1020}, {"input": 50, "output": 5, "total": 55})
+
+    # Waktu observation = waktu yang direkam handler, bukan waktu export
+    recorded = {event["id"]: event for event in record["events"]}
+    for event_id, event in recorded.items():
+        body = observations[event_id]
+        assert body.start_time.timestamp() == pytest.approx(event["start_time"])
+        assert body.end_time - body.start_time == timedelta(seconds=event["duration"])
+    assert spans[root_id].start_time.timestamp() == pytest.approx(record["start_time"])
+
+
+def test_exporter_events_serialize_for_ingestion_api():
+    from langfuse.api.core.jsonable_encoder import jsonable_encoder
+
+    client = _FakeClient()
+    LangfuseExporter(client).export([_record()[0], _record()[0]])
+
+    payload = json.loads(json.dumps(jsonable_encoder(client.api.ingestion.batches[0])))
+    generation = next(event for event in payload if event["type"] == "generation-create")
+    assert generation["body"]["model"] == "gpt-4o-mini"
+    assert generation["body"]["usageDetails"]["total"] in (1020, 55)
+    assert generation["body"]["parentObservationId"]
+    assert sum(event["type"] == "trace-create" for event in payload) == 2
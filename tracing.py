@@ -0,0 +1,334 @@
+"""
+Tracing ringan untuk agent: head sampling, antrean terbatas, dan export batch.
+
+Sebelumnya setiap giliran chat membuat CallbackHandler Langfuse baru dan setiap
+event LLM/tool/sub-agent dikirim lewat callback secara sinkron. Di sini:
+- Keputusan sampling diambil sekali di awal giliran (head sampling). Giliran yang
+  tidak di-sample tidak memasang callback sama sekali.
+- Handler hanya mencatat event (nama, waktu, durasi, token) ke list milik giliran
+  itu; tidak ada I/O di jalur chat.
+- Saat giliran selesai, satu record dimasukkan ke antrean in-process yang
+  terbatas (record dibuang jika penuh, bukan memblokir chat).
+- Thread latar belakang mengambil record per batch dan mengirimnya ke exporter
+  (Langfuse, atau HTTP JSON untuk collector lokal/pengujian).
+- LangfuseExporter membangun ulang pohon observation dari parent_run_id dengan
+  waktu mulai/selesai yang tercatat; event LLM dikirim sebagai generation
+  (model + usage_details), semua record satu batch dalam satu request ingestion.
+- Jika exporter tidak tersedia (mis. get_client() gagal), Tracer nonaktif dan
+  start_turn() selalu mengembalikan None.
+"""
+
+import json
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))  # 0.0 - 1.0, per giliran chat
+TRACE_QUEUE_SIZE = 1000  # record giliran maksimum yang menunggu export
+TRACE_BATCH_SIZE = 20
+TRACE_FLUSH_INTERVAL = 2.0  # detik
+
+
+class TurnTraceHandler(BaseCallbackHandler):
+    """Callback handler yang hanya mencatat event satu giliran ke memori."""
+
+    def __init__(self):
+        self.events = []
+        self._open = {}
+
+    def _start(self, run_id, parent_run_id, kind, name, model=None):
+        self._open[run_id] = (kind, name, parent_run_id, model, time.time(), time.perf_counter())
+
+    def _end(self, run_id, error=None, usage=None):
+        started = self._open.pop(run_id, None)
+        if started is None:
+            return
+        kind, name, parent_run_id, model, start_time, start_perf = started
+        self.events.append({
+            "id": str(run_id),
+            "parent_id": str(parent_run_id) if parent_run_id else None,
+            "kind": kind,
+            "name": name,
+            "model": model,
+            "start_time": start_time,
+            "duration": time.perf_counter() - start_perf,
+            "error": str(error) if error else None,
+            "usage": usage,
+        })
+
+    @staticmethod
+    def _name(serialized, kwargs, default):
+        if kwargs.get("name"):
+            return kwargs["name"]
+        if serialized:
+            return serialized.get("name") or (serialized.get("id") or [default])[-1]
+        return default
+
+    @staticmethod
+    def _model(kwargs):
+        params = kwargs.get("invocation_params") or {}
+        metadata = kwargs.get("metadata") or {}
+        return params.get("model") or params.get("model_name") or metadata.get("ls_model_name")
+
+    @staticmethod
+    def _usage(response):
+        """Token usage -> {"input", "output", "total"} (format usage_details Langfuse)."""
+        usage = (getattr(response, "llm_output", None) or {}).get("token_usage")
+        if usage:
+            input_tokens, output_tokens = usage.get("prompt_tokens"), usage.get("completion_tokens")
+            total = usage.get("total_tokens")
+        else:
+            # Model tanpa llm_output (mis. streaming): pakai usage_metadata di pesan hasil
+            generations = getattr(response, "generations", None) or [[]]
+            message = getattr(generations[0][0], "message", None) if generations[0] else None
+            usage = getattr(message, "usage_metadata", None)
+            if not usage:
+                return None
+            input_tokens, output_tokens = usage.get("input_tokens"), usage.get("output_tokens")
+            total = usage.get("total_tokens")
+        details = {"input": input_tokens, "output": output_tokens, "total": total}
+        return {key: int(value) for key, value in details.items() if value is not None}
+
+    # Chain / agent
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, parent_run_id, "chain", self._name(serialized, kwargs, "chain"))
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+    # LLM
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, parent_run_id, "llm", self._name(serialized, kwargs, "chat_model"), self._model(kwargs))
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, parent_run_id, "llm", self._name(serialized, kwargs, "llm"), self._model(kwargs))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end(run_id, usage=self._usage(response))
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+    # Tool
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, parent_run_id, "tool", self._name(serialized, kwargs, "tool"))
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+
+class TurnTrace:
+    """Trace satu giliran chat yang lolos sampling."""
+
+    def __init__(self, tracer, name, session_id, user_id, tags, input):
+        self.tracer = tracer
+        self.handler = TurnTraceHandler()
+        self.record = {
+            "trace_id": uuid.uuid4().hex,
+            "name": name,
+            "session_id": session_id,
+            "user_id": user_id,
+            "tags": list(tags or []),
+            "input": input,
+            "start_time": time.time(),
+        }
+        self._start_perf = time.perf_counter()
+
+    def finish(self, output=None, error=None):
+        """Tutup giliran dan serahkan record ke antrean export (non-blocking)."""
+        self.record.update(
+            output=output,
+            error=str(error) if error else None,
+            duration=time.perf_counter() - self._start_perf,
+            events=self.handler.events,
+        )
+        self.tracer.enqueue(self.record)
+
+
+class Tracer:
+    """Head sampler + antrean terbatas + thread export batch."""
+
+    def __init__(
+        self,
+        exporter,
+        sample_rate=TRACE_SAMPLE_RATE,
+        queue_size=TRACE_QUEUE_SIZE,
+        batch_size=TRACE_BATCH_SIZE,
+        flush_interval=TRACE_FLUSH_INTERVAL,
+    ):
+        self.exporter = exporter
+        self.sample_rate = sample_rate if exporter is not None else 0.0
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.exported = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._worker = None
+        if self.enabled:
+            self._worker = threading.Thread(target=self._export_loop, name="trace-export", daemon=True)
+            self._worker.start()
+
+    @property
+    def enabled(self):
+        return self.sample_rate > 0
+
+    def start_turn(self, name, session_id=None, user_id=None, tags=None, input=None):
+        """Mulai trace giliran jika lolos head sampling; None jika tidak di-trace."""
+        if not self.enabled or random.random() >= self.sample_rate:
+            return None
+        return TurnTrace(self, name, session_id, user_id, tags, input)
+
+    def enqueue(self, record):
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _export_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self.exporter.export(batch)
+                self.exported += len(batch)
+            except Exception as e:
+                self.dropped += len(batch)
+                print(f"Peringatan: Gagal mengirim {len(batch)} trace. Error: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def flush(self, timeout=None):
+        """Tunggu sampai antrean kosong (untuk shutdown/benchmark)."""
+        if not self.enabled:
+            return
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return
+            time.sleep(0.01)
+
+
+def _timestamp(seconds):
+    return datetime.fromtimestamp(seconds, tz=timezone.utc)
+
+
+class LangfuseExporter:
+    """
+    Kirim record giliran ke Langfuse: satu trace per giliran, observation root untuk
+    giliran itu, lalu satu observation per event dengan parent sesuai parent_run_id
+    (event tanpa parent yang tercatat digantung ke root). Waktu mulai/selesai memakai
+    waktu yang direkam handler, bukan waktu export. Event LLM menjadi generation.
+    Satu batch dikirim lewat satu request ingestion API.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def build_events(self, record):
+        """Event ingestion (trace, span, generation) untuk satu record giliran."""
+        from langfuse.api import (
+            CreateGenerationBody, CreateSpanBody, IngestionEvent_GenerationCreate,
+            IngestionEvent_SpanCreate, IngestionEvent_TraceCreate, TraceBody,
+        )
+
+        trace_id = record["trace_id"]
+        turn_start = _timestamp(record["start_time"])
+        turn_end = turn_start + timedelta(seconds=record["duration"])
+        root_id = f"{trace_id}-turn"
+        event_ids = {event["id"] for event in record["events"]}
+
+        def envelope(event_class, body):
+            return event_class(id=uuid.uuid4().hex, timestamp=turn_end.isoformat(), body=body)
+
+        events = [
+            envelope(IngestionEvent_TraceCreate, TraceBody(
+                id=trace_id,
+                timestamp=turn_start,
+                name=record["name"],
+                session_id=record["session_id"],
+                user_id=record["user_id"],
+                tags=record["tags"],
+                input=record["input"],
+                output=record["output"],
+            )),
+            envelope(IngestionEvent_SpanCreate, CreateSpanBody(
+                id=root_id,
+                trace_id=trace_id,
+                name=record["name"],
+                start_time=turn_start,
+                end_time=turn_end,
+                input=record["input"],
+                output=record["output"],
+                level="ERROR" if record["error"] else "DEFAULT",
+                status_message=record["error"],
+            )),
+        ]
+
+        for event in record["events"]:
+            start = _timestamp(event["start_time"])
+            common = {
+                "id": event["id"],
+                "trace_id": trace_id,
+                "parent_observation_id": event["parent_id"] if event["parent_id"] in event_ids else root_id,
+                "name": event["name"],
+                "start_time": start,
+                "end_time": start + timedelta(seconds=event["duration"]),
+                "metadata": {"kind": event["kind"]},
+                "level": "ERROR" if event["error"] else "DEFAULT",
+                "status_message": event["error"],
+            }
+            if event["kind"] == "llm":
+                events.append(envelope(IngestionEvent_GenerationCreate, CreateGenerationBody(
+                    **common, model=event.get("model"), usage_details=event["usage"],
+                )))
+            else:
+                events.append(envelope(IngestionEvent_SpanCreate, CreateSpanBody(**common)))
+        return events
+
+    def export(self, batch):
+        events = [event for record in batch for event in self.build_events(record)]
+        response = self.client.api.ingestion.batch(batch=events)
+        errors = getattr(response, "errors", None)
+        if errors:
+            # Event lain di batch tetap diterima; cukup catat yang ditolak
+            print(f"Peringatan: {len(errors)} event trace ditolak Langfuse. Contoh: {errors[0]}")
+
+
+class HttpJsonExporter:
+    """Kirim batch record sebagai JSON ke endpoint HTTP (collector lokal / pengujian)."""
+
+    def __init__(self, url, timeout=5.0):
+        self.url = url
+        self.timeout = timeout
+
+    def export(self, batch):
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(batch, default=str).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()